@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, TextIO
+
+from mcp_client_prompt_LLM import run_pipeline_async
+from metrics import collect_timings
+
+
+# ---------------------------------------------------------
+#  Input: one JSON object per line — {"query": "..."} or
+#  {"member_query": "..."}, optional "id". Streamed, never
+#  loaded whole.
+# ---------------------------------------------------------
+def read_records(stream: TextIO, offset: int = 0) -> Iterator[tuple[int, dict]]:
+    index = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if index >= offset:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"_error": f"invalid JSON: {e}"}
+            if not isinstance(record, dict):
+                record = {"query": str(record)}
+            yield index, record
+        index += 1
+
+
+def last_index(path: str) -> int | None:
+    # Input index of the last complete row already written
+    index = None
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    index = json.loads(line)["index"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return index
+
+
+# ---------------------------------------------------------
+#  One record → one output row (errors are rows, not crashes)
+# ---------------------------------------------------------
+async def process(index: int, record: dict, breakdown: bool = False) -> dict:
+    query = record.get("query") or record.get("member_query")
+    row = {"index": index, "id": record.get("id"), "query": query}
+    started = time.perf_counter()
+    with collect_timings() as steps:
+        if record.get("_error") or not query:
+            row["error"] = record.get("_error", "missing 'query'")
+        else:
+            try:
+                result = await run_pipeline_async(query)
+                row.update({
+                    "context": result.context,
+                    "response": result.response,
+                    "docs": [doc.get("name") for doc in result.final_docs],
+                    "errors": result.errors,
+                })
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+    row["timings"] = {"total_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if breakdown:
+        # Per-step / per-MCP-method spans (ms); overlapping steps can sum past total
+        row["timings"]["steps"] = steps
+    return row
+
+
+# ---------------------------------------------------------
+#  Bounded-concurrency driver
+#
+#  At most `concurrency` pipelines in flight; rows are written as
+#  they finish ("completion") or held back until every earlier
+#  row is out ("input"), which keeps the output resumable.
+# ---------------------------------------------------------
+async def run_batch(
+    records: Iterator[tuple[int, dict]], out: TextIO, concurrency: int, order: str, breakdown: bool = False
+) -> int:
+    # Each pipeline runs its blocking steps on worker threads
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 3))
+
+    pending: set[asyncio.Task] = set()
+    held: dict[int, dict] = {}
+    next_index: int | None = None
+    written = 0
+
+    def emit(row: dict) -> None:
+        nonlocal written
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        out.flush()
+        written += 1
+
+    def collect(done: set[asyncio.Task]) -> None:
+        nonlocal next_index
+        for task in done:
+            row = task.result()
+            if order == "completion":
+                emit(row)
+            else:
+                held[row["index"]] = row
+        if order == "input":
+            while next_index in held:
+                emit(held.pop(next_index))
+                next_index += 1
+
+    for index, record in records:
+        if next_index is None:
+            next_index = index
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            collect(done)
+        pending.add(asyncio.create_task(process(index, record, breakdown)))
+
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        collect(done)
+    return written
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the member-query pipeline over a JSONL file of queries.")
+    parser.add_argument("input", nargs="?", default="requests.jsonl", help="JSONL input path, or '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output path, or '-' for stdout")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="max pipelines in flight")
+    parser.add_argument("--order", choices=["completion", "input"], default="completion",
+                        help="write rows as they finish, or in input order")
+    parser.add_argument("--offset", type=int, default=0, help="skip the first N input records")
+    parser.add_argument("--timings", action="store_true", help="add a per-step timing breakdown to each row")
+    parser.add_argument("--resume", action="store_true",
+                        help="append to --output and continue after the last record it holds (needs --order input)")
+    args = parser.parse_args(argv)
+
+    offset = args.offset
+    mode = "w"
+    if args.resume:
+        if args.output == "-" or args.order != "input":
+            parser.error("--resume needs a file --output and --order input")
+        # Rows carry their input index, so this holds whatever --offset the earlier run used
+        written_up_to = last_index(args.output)
+        if written_up_to is not None:
+            offset = max(offset, written_up_to + 1)
+        mode = "a"
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, mode, encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        written = asyncio.run(run_batch(
+            read_records(source, offset), out, max(1, args.concurrency), args.order, args.timings
+        ))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ {written} rows written from offset {offset} in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
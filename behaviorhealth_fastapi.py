@@ -1,9 +1,36 @@
-from fastapi import FastAPI
-import requests
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Literal
 
-app = FastAPI()
+import anthropic
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
-SOURCE_URL = "https://assets.bcbsnc.com/assets/employer/content/healthandwellness/endpoints/behaviourHealth.json"
+from catalog_cache import CatalogCache
+from doc_index import get_catalog_index
+from metrics import render_prometheus
+from resilience import DeadlineExceeded
+from response_bytes import EncodedCache
+from shared_catalog import SHARED_CATALOG_DIR, SharedCatalog, SharedSnapshot
+from mcp_client_prompt_LLM import (
+    answer_member_query,
+    cached_summary,
+    close_pipeline,
+    prepare_pipeline_async,
+    summary_cache,
+    summary_cache_key,
+    summarize_docs_llm_stream,
+    warm_pipeline,
+)
+from snapshot_store import SNAPSHOT_DB_PATH, SnapshotStore
+
+SOURCE_URL = os.getenv(
+    "SOURCE_URL",
+    "https://assets.bcbsnc.com/assets/employer/content/healthandwellness/endpoints/behaviourHealth.json",
+)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
@@ -13,14 +40,173 @@ HEADERS = {
     "Origin": "https://www.bcbsnc.com"
 }
 
-@app.get("/behavior-health")
-def get_behavior_health():
-    response = requests.get(SOURCE_URL, headers=HEADERS)
-    response.raise_for_status()
-    data = response.json()
-
-    # ✅ Just return directly — FastAPI handles serialization
-    if isinstance(data, list):
-        return data
+# Last good catalog survives restarts when SNAPSHOT_DB_PATH is set
+snapshot_store = SnapshotStore(SNAPSHOT_DB_PATH) if SNAPSHOT_DB_PATH else None
+
+# Shared across requests — TTL / stale window come from CATALOG_* env vars
+catalog_cache = CatalogCache(SOURCE_URL, headers=HEADERS, store=snapshot_store)
+
+# Multi-worker: one elected worker refreshes, all of them serve the same
+# memory-mapped snapshot (SHARED_CATALOG_DIR, unset → per-worker cache)
+shared_catalog = SharedCatalog(SHARED_CATALOG_DIR, catalog_cache) if SHARED_CATALOG_DIR else None
+
+
+async def prime_pipeline() -> None:
+    # In the background: the gateway's tool call may route back to this worker
+    try:
+        await asyncio.to_thread(warm_pipeline)
+    except Exception as e:
+        print(f"Pipeline warm-up failed: {e!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive client for the life of the worker; with a
+    # shared catalog only the refresher starts (and fills) its own cache
+    if shared_catalog is not None:
+        await shared_catalog.start()
     else:
-        return [data]
\ No newline at end of file
+        await catalog_cache.start()
+    # Anthropic client now; tool docs + retrieval index once serving
+    await asyncio.to_thread(warm_pipeline, False)
+    warm_up = asyncio.create_task(prime_pipeline())
+    yield
+    warm_up.cancel()
+    if shared_catalog is not None:
+        await shared_catalog.close()
+    await catalog_cache.close()
+    close_pipeline()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# Serialized + gzip/brotli bytes per catalog version and query variant
+encoded_bodies = EncodedCache()
+
+
+@app.get("/behavior-health")
+async def get_behavior_health(
+    request: Request,
+    context: Literal["anxiety", "depression", "sud", "youth-bh", "general"] | None = None,
+    fields: str | None = Query(None, description="Comma-separated doc fields to keep, e.g. name,description"),
+    limit: int | None = Query(None, ge=0, description="Max docs across all categories"),
+    since: int | None = Query(None, ge=0, description="Only docs added/changed (and keys of docs removed) after this catalog version"),
+):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    snapshot = await shared_catalog.get() if shared_catalog is not None else None
+    if snapshot is not None:
+        return await shared_response(request, snapshot, context, field_list, limit, since)
+
+    # ✅ Served from memory; concurrent misses share one upstream fetch
+    catalog = await catalog_cache.get()
+    version, content_hash = catalog_cache.version, catalog_cache.hash
+    key = (context, tuple(field_list) if field_list else None, limit, since, version if since is not None else None)
+
+    body = encoded_bodies.peek(catalog, key)
+    if body is None:
+        def build():
+            if since is not None:
+                # {"version", "hash", "since", "full", "added", "changed", "removed"}:
+                # added/changed are docs, removed is doc keys (name, or "name#2")
+                return catalog_cache.versions.diff(since, field_list)
+            if context is None and field_list is None and limit is None:
+                return catalog
+            # Filter / project against the per-catalog index instead of shipping everything
+            return get_catalog_index(catalog).select(context, field_list, limit)
+
+        # Serialize + compress once per version, off the event loop
+        body = await asyncio.to_thread(encoded_bodies.get, catalog, key, build)
+    return body.response(request, {"X-Catalog-Version": str(version), "X-Catalog-Hash": content_hash})
+
+
+async def shared_response(
+    request: Request,
+    snapshot: SharedSnapshot,
+    context: str | None,
+    field_list: list[str] | None,
+    limit: int | None,
+    since: int | None,
+):
+    headers = {"X-Catalog-Version": str(snapshot.version), "X-Catalog-Hash": snapshot.hash}
+    if since is None and field_list is None and limit is None:
+        # Full catalog / ?context= were encoded by the refresher — straight from the mapping
+        return snapshot.bodies[context or ""].response(request, headers)
+
+    key = (context, tuple(field_list) if field_list else None, limit, since)
+    body = encoded_bodies.peek(snapshot, key)
+    if body is None:
+        def build():
+            if since is not None:
+                return snapshot.diff(since, field_list)
+            return snapshot.select(context, field_list, limit)
+
+        body = await asyncio.to_thread(encoded_bodies.get, snapshot, key, build)
+    return body.response(request, headers)
+
+
+class MemberQuery(BaseModel):
+    query: str = Field(min_length=1, description="The member's question, as typed")
+    # Member-specific queries must never share (or seed) a cached answer
+    personalized: bool = Field(False, description="Skip the final-response cache")
+
+
+@app.post("/member-query")
+async def post_member_query(body: MemberQuery):
+    # {"member_query", "context", "response", "cached", "docs", "errors"} — step failures land in "errors"
+    try:
+        return await answer_member_query(body.query, use_cache=not body.personalized)
+    except (DeadlineExceeded, anthropic.APITimeoutError) as e:
+        raise HTTPException(status_code=504, detail=f"Member query timed out: {e}")
+
+
+def sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/behavior-health/summary/stream")
+async def stream_behavior_health_summary(body: MemberQuery):
+    # POST, so the member's query stays out of URLs and access logs.
+    # Classify + fetch docs up front, then stream the summary token by token
+    query = body.query
+    result = await prepare_pipeline_async(query)
+    key = summary_cache_key(result, use_cache=not body.personalized)
+    cached = cached_summary(key)
+
+    def events():
+        yield sse({
+            "context": result.context,
+            "docs": [doc.get("name") for doc in result.final_docs],
+            "errors": result.errors,
+            "cached": cached is not None,
+        }, event="context")
+        if cached is not None:
+            # A cached answer goes out as a single delta
+            yield sse({"text": cached})
+            yield sse({}, event="done")
+            return
+        parts = []
+        try:
+            for text in summarize_docs_llm_stream(query, result.context, result.final_docs, result.prompt_text):
+                parts.append(text)
+                yield sse({"text": text})
+        except Exception as e:
+            yield sse({"error": str(e)}, event="error")
+            return
+        if key is not None:
+            summary_cache.put(key, "".join(parts))
+        yield sse({}, event="done")
+
+    # Sync generator → Starlette iterates it on the threadpool
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text exposition — per-worker counters / histograms
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------------------------------------------------
+#  Synthetic catalog — names/descriptions reuse the real
+#  context vocabulary so filtering and retrieval have work to do
+# ---------------------------------------------------------
+TOPICS = {
+    "sud": ["substance use", "alcohol", "drug", "opioid recovery", "sud treatment"],
+    "anxiety": ["anxiety", "stress", "panic", "worry", "mental health"],
+    "depression": ["depression", "mood", "sadness", "mental health", "hopelessness"],
+    "youth-bh": ["youth", "adolescent", "young adult", "teen", "ybh"],
+    "general": ["wellness", "benefits", "eap", "care navigation", "coaching"],
+}
+FILLER = "support program guide resource member employer plan coverage online virtual care line toolkit".split()
+LINK_FIELDS = ("onEnglishAction", "onEnglishEmailSave", "onEnglishVideoAction")
+
+
+def make_catalog(n_docs: int, categories: int = 3, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    catalog = [
+        {"title": f"Category {c}", "summary": "Behavioral health resources for members.", "Docs": []}
+        for c in range(categories)
+    ]
+    topics = list(TOPICS)
+    for i in range(n_docs):
+        topic = topics[i % len(topics)]
+        phrase = rng.choice(TOPICS[topic])
+        doc = {
+            "name": f"{phrase.title()} {rng.choice(FILLER).title()} {i}",
+            "description": f"{phrase} " + " ".join(rng.choices(FILLER, k=18)) + ".",
+            rng.choice(LINK_FIELDS): f"https://example.invalid/docs/{i}",
+            "thumbnail": f"https://example.invalid/img/{i}.png",
+            "tags": rng.sample(FILLER, 3),
+        }
+        catalog[i % categories]["Docs"].append(doc)
+    return catalog
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that time out / hedge hang up mid-response; that's expected here
+        pass
+
+
+def serve(handler: type[BaseHTTPRequestHandler]) -> ThreadingHTTPServer:
+    server = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url_of(server: ThreadingHTTPServer, path: str = "/") -> str:
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def send_json(self, status: int, payload, headers: dict | None = None) -> None:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0) or b"null")
+
+
+# ---------------------------------------------------------
+#  Fake upstream CDN (assets.bcbsnc.com)
+# ---------------------------------------------------------
+def upstream_server(n_docs: int = 100, latency: float = 0.05) -> ThreadingHTTPServer:
+    body = json.dumps(make_catalog(n_docs)).encode()
+    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+    class Upstream(_Handler):
+        hits = 0
+
+        def do_GET(self):
+            Upstream.hits += 1
+            time.sleep(latency)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_json(200, body, {"ETag": etag})
+
+    return serve(Upstream)
+
+
+# ---------------------------------------------------------
+#  Fake MCP gateway (JSON-RPC 2.0, single + batch)
+#
+#  tools/call proxies to `tool_url` (e.g. a running
+#  /behavior-health) when given, else serves a synthetic catalog.
+# ---------------------------------------------------------
+def gateway_server(n_docs: int = 100, latency: float = 0.01, tool_url: str | None = None) -> ThreadingHTTPServer:
+    catalog_text = json.dumps(make_catalog(n_docs))
+    catalog_hash = hashlib.blake2b(catalog_text.encode(), digest_size=16).hexdigest()
+
+    def tool_text(arguments: dict) -> tuple[str, str | None]:
+        # Relays the endpoint's X-Catalog-Hash as the result's _meta
+        if not tool_url:
+            return catalog_text, catalog_hash
+        query = urllib.parse.urlencode({k: v for k, v in arguments.items() if v is not None})
+        with urllib.request.urlopen(tool_url + ("?" + query if query else ""), timeout=30) as response:
+            return response.read().decode(), response.headers.get("X-Catalog-Hash")
+
+    def handle(request: dict) -> dict:
+        method, params = request.get("method"), request.get("params") or {}
+        if method == "tools/call":
+            text, content_hash = tool_text(params.get("arguments") or {})
+            result = {"content": [{"type": "text", "text": text}], "isError": False}
+            if content_hash is not None:
+                result["_meta"] = {"catalogHash": content_hash}
+        elif method == "tools/list":
+            result = {"tools": [{
+                "name": "employerassestfastapi-local",
+                "description": "Behavioral health catalog",
+                "inputSchema": {"type": "object", "properties": {
+                    "context": {"type": "string"}, "fields": {"type": "string"}, "limit": {"type": "integer"},
+                }},
+                "outputSchema": {"type": "array", "items": {"type": "object"}},
+            }]}
+        elif method == "prompts/list":
+            result = {"prompts": [{"name": "behavioral-health-context-router",
+                                   "arguments": [{"name": "member_query"}, {"name": "context"}]}]}
+        elif method == "resources/list":
+            result = {"resources": [{"uri": f"resource://bcbsnc/{c}", "name": c} for c in TOPICS]}
+        elif method == "prompts/get":
+            args = params.get("arguments") or {}
+            text = (f"A member asked: {args.get('member_query')}\nDetected context: {args.get('context')}\n"
+                    "Recommend the most relevant resources.")
+            result = {"messages": [{"role": "user", "content": {"type": "text", "text": text}}]}
+        elif method == "resources/read":
+            context = params.get("uri", "").rsplit("/", 1)[-1]
+            docs = [{"name": f"Curated {context} line", "description": f"Curated {context} support.",
+                     "onEnglishAction": f"https://example.invalid/curated/{context}"}]
+            result = {"contents": [{"uri": params.get("uri"), "mimeType": "application/json",
+                                    "text": json.dumps({"context": context, "docs": docs})}]}
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    class Gateway(_Handler):
+        def do_POST(self):
+            time.sleep(latency)
+            body = self.read_json()
+            if isinstance(body, list):
+                self.send_json(200, [handle(item) for item in body])
+            else:
+                self.send_json(200, handle(body))
+
+    return serve(Gateway)
+
+
+# ---------------------------------------------------------
+#  Fake Anthropic Messages API (plain + SSE streaming)
+# ---------------------------------------------------------
+SUMMARY_TEXT = ("I'm sorry you're going through this. Here are a few resources that can help right away. "
+                "Please reach out — support is available any time.")
+
+
+def anthropic_server(latency: float = 0.2, token_delay: float = 0.01) -> ThreadingHTTPServer:
+    def classify(text: str) -> str:
+        text = text.lower()
+        for label, phrases in TOPICS.items():
+            if any(p.split()[0] in text for p in phrases):
+                return label
+        return "general"
+
+    class Anthropic(_Handler):
+        def do_POST(self):
+            body = self.read_json()
+            messages = body.get("messages") or [{}]
+            content = messages[-1].get("content", "")
+            if isinstance(content, list):
+                content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+            # The classifier call is the only one with max_tokens=100
+            text = classify(content) if body.get("max_tokens") == 100 else SUMMARY_TEXT
+            time.sleep(latency)
+            if body.get("stream"):
+                self.stream(text)
+            else:
+                self.send_json(200, {
+                    "id": "msg_fake", "type": "message", "role": "assistant", "model": body.get("model"),
+                    "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": {"input_tokens": len(content) // 4, "output_tokens": len(text) // 4},
+                })
+
+        def stream(self, text: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def event(name: str, data: dict) -> None:
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+
+            event("message_start", {"type": "message_start", "message": {
+                "id": "msg_fake", "type": "message", "role": "assistant", "model": "fake", "content": [],
+                "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 1, "output_tokens": 0}}})
+            event("content_block_start", {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}})
+            for word in text.split(" "):
+                time.sleep(token_delay)
+                event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                              "delta": {"type": "text_delta", "text": word + " "}})
+            event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                    "usage": {"output_tokens": len(text) // 4}})
+            event("message_stop", {"type": "message_stop"})
+            self.close_connection = True
+
+    return serve(Anthropic)
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+
+from bench.fakes import TOPICS, anthropic_server, gateway_server, make_catalog, upstream_server, url_of
+
+# ---------------------------------------------------------
+#  Offline benchmarks — everything talks to local fakes
+#
+#    python -m bench.run_bench endpoint  -c 32 -n 2000
+#    python -m bench.run_bench pipeline  -c 8  -n 200 [--full-stack]
+#    python -m bench.run_bench scale     --sizes 10,1000,100000
+#    python -m bench.run_bench all       --json bench.json
+#
+#  The app modules read their config at import time, so they are
+#  imported only after the fakes are up and the env points at them.
+# ---------------------------------------------------------
+DEFAULT_SIZES = "10,100,1000,10000,100000"
+
+
+def percentile(values: list[float], p: float) -> float:
+    # Nearest-rank; good enough for a few hundred samples
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(max(samples, default=0.0), 2),
+    }
+
+
+def print_table(title: str, rows: dict[str, dict], extra: str = "") -> None:
+    print(f"\n{'=' * 72}\n{title}{'  ' + extra if extra else ''}\n{'=' * 72}")
+    print(f"  {'step':<28}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in rows.items():
+        print(f"  {name:<28}{s['n']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+
+
+def bench_queries(n: int) -> list[str]:
+    # Unique text per query so classification / retrieval caches don't flatter the numbers
+    phrases = [(context, phrase) for context, items in TOPICS.items() for phrase in items]
+    return [f"I need help with {phrases[i % len(phrases)][1]} for my family, case {i}" for i in range(n)]
+
+
+# ---------------------------------------------------------
+#  Environment: fakes up, env pointed at them
+# ---------------------------------------------------------
+class Stack:
+    def __init__(self, args: argparse.Namespace):
+        self.upstream = upstream_server(args.docs, args.upstream_latency)
+        # Pick the app's port first so the gateway can proxy tools/call to it.
+        # uvicorn binds it itself: a handed-over socket skips TCP_NODELAY
+        # and adds a delayed-ACK stall to every keep-alive request.
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.app_port = probe.getsockname()[1]
+        self.app_url = f"http://127.0.0.1:{self.app_port}"
+        tool_url = self.app_url + "/behavior-health" if args.full_stack else None
+        self.gateway = gateway_server(args.docs, args.gateway_latency, tool_url)
+        self.anthropic = anthropic_server(args.llm_latency, args.token_delay)
+        self.server = None
+
+        os.environ.update({
+            "SOURCE_URL": url_of(self.upstream),
+            "MCP_URL": url_of(self.gateway, "/mcp"),
+            "ANTHROPIC_BASE_URL": url_of(self.anthropic),
+            "SNAPSHOT_DB_PATH": "",
+        })
+        os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+    def start_app(self) -> None:
+        if self.server is not None:
+            return
+        import uvicorn
+        from behaviorhealth_fastapi import app
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.app_port, log_level="warning"))
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def use_catalog(self, n_docs: int, latency: float) -> None:
+        # Point the running app at a fresh upstream of a different size
+        from behaviorhealth_fastapi import catalog_cache
+
+        self.upstream = upstream_server(n_docs, latency)
+        catalog_cache.url = url_of(self.upstream)
+        catalog_cache.invalidate()
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.should_exit = True
+        for server in (self.upstream, self.gateway, self.anthropic):
+            server.shutdown()
+
+
+# ---------------------------------------------------------
+#  /behavior-health under load
+# ---------------------------------------------------------
+ENDPOINT_MIX = [
+    {},
+    {"context": "anxiety"},
+    {"context": "sud", "fields": "name,description,onEnglishAction"},
+    {"context": "youth-bh", "limit": 20},
+]
+
+
+async def drive_endpoint(url: str, requests: int, concurrency: int, compressed: bool) -> dict:
+    headers = {"Accept-Encoding": "gzip, br" if compressed else "identity"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    samples: dict[str, list[float]] = {}
+    errors = 0
+    queue = iter(range(requests))
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for i in queue:
+                params = ENDPOINT_MIX[i % len(ENDPOINT_MIX)]
+                label = ",".join(f"{k}={v}" for k, v in params.items()) or "full"
+                started = time.perf_counter()
+                try:
+                    response = await client.get("/behavior-health", params=params)
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                    continue
+                samples.setdefault(label, []).append((time.perf_counter() - started) * 1000)
+
+        # Warm the catalog cache and encoded bodies outside the timed run
+        for params in ENDPOINT_MIX:
+            await client.get("/behavior-health", params=params)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    everything = [ms for values in samples.values() for ms in values]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(len(everything) / elapsed, 1),
+        "steps": {"total": summarize(everything), **{k: summarize(v) for k, v in samples.items()}},
+    }
+
+
+def bench_endpoint(stack: Stack, args: argparse.Namespace) -> dict:
+    stack.start_app()
+    result = asyncio.run(drive_endpoint(stack.app_url, args.requests, args.concurrency, not args.identity))
+    print_table(f"/behavior-health — {args.docs} docs", result["steps"],
+                f"{result['throughput_rps']} req/s, c={args.concurrency}, errors={result['errors']}")
+    return result
+
+
+# ---------------------------------------------------------
+#  Member-query pipeline under load (per-step spans)
+# ---------------------------------------------------------
+def bench_pipeline(stack: Stack, args: argparse.Namespace) -> dict:
+    if args.full_stack:
+        stack.start_app()
+    from batch_runner import process, run_batch
+
+    class Rows:
+        def __init__(self):
+            self.rows = []
+
+        def write(self, line: str) -> None:
+            self.rows.append(json.loads(line))
+
+        def flush(self) -> None:
+            pass
+
+    # One warm-up pipeline: imports, pools, catalog
+    asyncio.run(process(0, {"query": "warm up"}))
+
+    rows = Rows()
+    records = ((i, {"query": q}) for i, q in enumerate(bench_queries(args.requests)))
+    started = time.perf_counter()
+    asyncio.run(run_batch(records, rows, args.concurrency, "completion", breakdown=True))
+    elapsed = time.perf_counter() - started
+
+    steps: dict[str, list[float]] = {"total": []}
+    failed = 0
+    for row in rows.rows:
+        if row.get("error") or row.get("errors"):
+            failed += 1
+        steps["total"].append(row["timings"]["total_ms"])
+        for name, ms in row["timings"].get("steps", {}).items():
+            steps.setdefault(name, []).append(ms)
+
+    result = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "failed": failed,
+        "throughput_qps": round(len(rows.rows) / elapsed, 2),
+        "steps": {name: summarize(values) for name, values in steps.items()},
+    }
+    print_table("member-query pipeline" + (" (full stack)" if args.full_stack else ""), result["steps"],
+                f"{result['throughput_qps']} q/s, c={args.concurrency}, failed={failed}")
+    return result
+
+
+# ---------------------------------------------------------
+#  Catalog-size sweep — in-process cost of each stage, then
+#  the endpoint at that size
+# ---------------------------------------------------------
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def bench_scale(stack: Stack, args: argparse.Namespace) -> dict:
+    from doc_index import CatalogIndex, DocIndex
+    from doc_projection import compact_docs
+    from response_bytes import EncodedBody, dumps
+    from retrieval_index import RetrievalIndex
+
+    results = {}
+    query = "I've been feeling anxious and stressed at work"
+    for size in [int(s) for s in args.sizes.split(",")]:
+        catalog = make_catalog(size)
+        docs = [doc for category in catalog for doc in category["Docs"]]
+        repeat = max(3, min(50, 20_000 // max(size, 1)))
+        catalog_index = CatalogIndex(catalog)
+        retrieval = RetrievalIndex()
+        retrieval.update(docs)
+        filtered = catalog_index.select("anxiety")
+
+        steps = {
+            "parse (json.loads)": timed(lambda: json.loads(json.dumps(catalog)), repeat),
+            "index build": timed(lambda: CatalogIndex(catalog), repeat),
+            "filter (context)": timed(lambda: catalog_index.select("anxiety"), repeat),
+            "filter+project+limit": timed(
+                lambda: catalog_index.select("sud", ["name", "description", "onEnglishAction"], 20), repeat),
+            "keyword filter": timed(lambda: DocIndex(docs).filter("depression"), repeat),
+            "retrieval build": timed(lambda: RetrievalIndex().update(docs), max(3, repeat // 5)),
+            "retrieval search": timed(lambda: retrieval.search(query, "anxiety"), repeat),
+            "compact_docs": timed(lambda: compact_docs(docs, query, "anxiety"), repeat),
+            "serialize full": timed(lambda: dumps(catalog), repeat),
+            "encode full (+gzip/br)": timed(lambda: EncodedBody.encode(catalog), max(3, repeat // 5)),
+            "encode filtered": timed(lambda: EncodedBody.encode(filtered), max(3, repeat // 5)),
+        }
+        entry = {
+            "docs": size,
+            "catalog_bytes": len(dumps(catalog)),
+            "steps": {name: summarize(samples) for name, samples in steps.items()},
+        }
+        if not args.skip_endpoint:
+            stack.start_app()
+            stack.use_catalog(size, args.upstream_latency)
+            endpoint = asyncio.run(drive_endpoint(
+                stack.app_url, args.requests, args.concurrency, not args.identity))
+            entry["endpoint"] = endpoint
+            entry["steps"]["endpoint (mixed)"] = endpoint["steps"]["total"]
+
+        results[str(size)] = entry
+        extra = f"{entry['catalog_bytes'] / 1024:.0f} KiB"
+        if "endpoint" in entry:
+            extra += f", endpoint {entry['endpoint']['throughput_rps']} req/s"
+        print_table(f"catalog size {size}", entry["steps"], extra)
+    return results
+
+
+SCENARIOS = {"endpoint": bench_endpoint, "pipeline": bench_pipeline, "scale": bench_scale}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local fakes of every upstream.")
+    parser.add_argument("scenario", choices=[*SCENARIOS, "all"], nargs="?", default="all")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="requests / pipelines in flight")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="requests (or queries) per run")
+    parser.add_argument("--docs", type=int, default=1000, help="catalog size for endpoint / pipeline runs")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated catalog sizes for 'scale'")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="fake CDN latency (s)")
+    parser.add_argument("--gateway-latency", type=float, default=0.01, help="fake MCP gateway latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake Anthropic latency to first byte (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake Anthropic delay per streamed token (s)")
+    parser.add_argument("--full-stack", action="store_true",
+                        help="gateway tools/call goes through /behavior-health and the fake CDN")
+    parser.add_argument("--identity", action="store_true", help="request uncompressed bodies")
+    parser.add_argument("--skip-endpoint", action="store_true", help="'scale': in-process stages only")
+    parser.add_argument("--json", help="also write results to this path")
+    args = parser.parse_args(argv)
+
+    stack = Stack(args)
+    results = {"config": {k: v for k, v in vars(args).items() if k != "json"}}
+    try:
+        for name in (SCENARIOS if args.scenario == "all" else [args.scenario]):
+            results[name] = SCENARIOS[name](stack, args)
+    finally:
+        stack.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+# ---------------------------------------------------------
+#  Classification cache tuning — override via environment
+# ---------------------------------------------------------
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024"))
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", "86400"))
+CLASSIFICATION_CACHE_DB = os.getenv("CLASSIFICATION_CACHE_DB")  # unset → memory only
+
+# ---------------------------------------------------------
+#  Summary (final response) cache tuning
+# ---------------------------------------------------------
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+_APOSTROPHES = re.compile(r"['’`]")
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+def normalize_query(query: str) -> str:
+    # "Feeling really   DOWN lately!!" and "feeling really down lately" share a key
+    query = _APOSTROPHES.sub("", query.lower())
+    return " ".join(_PUNCTUATION.sub(" ", query).split())
+
+
+def fingerprint(obj: Any) -> str:
+    encoded = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------------
+#  Bounded LRU cache with a per-entry TTL
+# ---------------------------------------------------------
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= time.time():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# ---------------------------------------------------------
+#  SQLite-backed persistent tier (survives restarts)
+# ---------------------------------------------------------
+class SQLiteTier:
+    def __init__(self, path: str, table: str):
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def put(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------------------------------------------------
+#  detect_context_llm memoization
+#
+#  Keyed on normalize_query(query). Memory tier first, then the
+#  optional SQLite tier (promoted back into memory on a hit).
+# ---------------------------------------------------------
+class ClassificationCache:
+    def __init__(
+        self,
+        maxsize: int = CLASSIFICATION_CACHE_SIZE,
+        ttl: float = CLASSIFICATION_CACHE_TTL,
+        path: str | None = CLASSIFICATION_CACHE_DB,
+    ):
+        self.memory = TTLCache(maxsize, ttl)
+        self.persistent = SQLiteTier(path, "classifications") if path else None
+        self.persistent_hits = 0
+
+    def get(self, query: str) -> str | None:
+        key = normalize_query(query)
+        label = self.memory.get(key)
+        if label is not None or self.persistent is None:
+            return label
+        row = self.persistent.get(key)
+        if row is None:
+            return None
+        label, expires_at = row
+        self.persistent_hits += 1
+        self.memory.put(key, label, ttl=expires_at - time.time())
+        return label
+
+    def put(self, query: str, label: str) -> None:
+        key = normalize_query(query)
+        self.memory.put(key, label)
+        if self.persistent is not None:
+            self.persistent.put(key, label, time.time() + self.memory.ttl)
+
+    def stats(self) -> dict[str, int]:
+        stats = self.memory.stats()
+        stats["persistent_hits"] = self.persistent_hits
+        # A memory miss answered by SQLite is still a hit overall
+        stats["hits"] += self.persistent_hits
+        stats["misses"] -= self.persistent_hits
+        return stats
+
+
+# ---------------------------------------------------------
+#  summarize_docs_llm memoization
+#
+#  Keyed on (context, prompt template version, fingerprint of the
+#  merged docs — links included, normalized query), so a changed
+#  prompt or changed docs can never hit an old answer. When a
+#  context's prompt version moves on, its old entries are dropped
+#  at once; entries for docs that left the catalog age out via
+#  LRU / TTL.
+# ---------------------------------------------------------
+class ResponseCache:
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.enabled = enabled
+        self.memory = TTLCache(maxsize, ttl)
+        self._prompt_versions: dict[str, str] = {}
+
+    def key(self, context: str, prompt_version: str, docs: list, query: str) -> tuple | None:
+        if not self.enabled:
+            return None
+        return (context, prompt_version, fingerprint(docs), normalize_query(query))
+
+    def get(self, key: tuple) -> str | None:
+        return self.memory.get(key)
+
+    def put(self, key: tuple, response: str) -> None:
+        context, prompt_version = key[0], key[1]
+        if self._prompt_versions.get(context, prompt_version) != prompt_version:
+            self.invalidate(context)
+        self._prompt_versions[context] = prompt_version
+        self.memory.put(key, response)
+
+    def invalidate(self, context: str | None = None) -> None:
+        if context is None:
+            self.memory.clear()
+            return
+        with self.memory._lock:
+            for key in [k for k in self.memory._data if k[0] == context]:
+                del self.memory._data[key]
+
+    def stats(self) -> dict[str, int]:
+        return self.memory.stats()
@@ -0,0 +1,285 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from catalog_stream import CatalogBuilder, CatalogParser
+from catalog_versions import CatalogVersions
+from metrics import CATALOG_CACHE, CATALOG_FETCH_SECONDS
+from resilience import CircuitBreaker, CircuitOpenError
+from snapshot_store import SnapshotStore
+
+# ---------------------------------------------------------
+#  Cache tuning (seconds) — override via environment
+# ---------------------------------------------------------
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+CATALOG_STALE_SECONDS = float(os.getenv("CATALOG_STALE_SECONDS", "3600"))
+CATALOG_FETCH_TIMEOUT = float(os.getenv("CATALOG_FETCH_TIMEOUT", "10"))
+CATALOG_MAX_CONNECTIONS = int(os.getenv("CATALOG_MAX_CONNECTIONS", "10"))
+# Parse the upstream body incrementally as it downloads (0 → response.json())
+CATALOG_STREAM_PARSE = os.getenv("CATALOG_STREAM_PARSE", "1").lower() not in ("0", "false", "no")
+
+
+@dataclass
+class CatalogEntry:
+    data: list[Any]
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    version: int = 0
+    hash: str = ""  # content hash — unlike `version`, the same in every process
+
+
+def normalize_catalog(data: Any) -> list[Any]:
+    # The upstream sometimes returns a single category object
+    return data if isinstance(data, list) else [data]
+
+
+# ---------------------------------------------------------
+#  In-process catalog cache
+#
+#  - fresh  (age < ttl)          -> served from memory
+#  - stale  (age < ttl + stale)  -> served from memory, refreshed in background
+#  - expired / empty             -> caller awaits a refresh
+#
+#  Refreshes send If-None-Match / If-Modified-Since; a 304 keeps the
+#  already-parsed payload and only resets its age. At most one upstream
+#  fetch is in flight at a time — concurrent misses all await that same
+#  task (single-flight). A 200 body is parsed doc by doc while it
+#  downloads (catalog_stream), not buffered and loaded in one go.
+#
+#  With a SnapshotStore, start() boots from the last good payload (as
+#  stale, so it is served at once and revalidated), every fresh 200 is
+#  written back, and a failed refresh keeps serving what we have.
+#
+#  Every payload is versioned by content (see CatalogVersions). A 200
+#  whose content hashes the same as what we hold keeps the existing
+#  list object, so identity-keyed indexes and encoded bodies survive.
+#
+#  A circuit breaker sits in front of the upstream: once it opens,
+#  refreshes fail immediately and whatever we hold (memory or
+#  snapshot, however old) is served instead of waiting on timeouts.
+# ---------------------------------------------------------
+class CatalogCache:
+    def __init__(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        ttl: float = CATALOG_TTL_SECONDS,
+        stale: float = CATALOG_STALE_SECONDS,
+        timeout: float = CATALOG_FETCH_TIMEOUT,
+        max_connections: int = CATALOG_MAX_CONNECTIONS,
+        store: SnapshotStore | None = None,
+    ):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.ttl = ttl
+        self.stale = stale
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.store = store
+        self.versions = CatalogVersions()
+        self.breaker = CircuitBreaker("catalog_upstream")
+        self._client: httpx.AsyncClient | None = None
+        self._entry: CatalogEntry | None = None
+        self._inflight: asyncio.Task | None = None
+
+    # -----------------------------------------------------
+    #  Lifecycle — one pooled keep-alive client per process
+    # -----------------------------------------------------
+    async def start(self) -> None:
+        if self._entry is None and self.store is not None:
+            await asyncio.to_thread(self._load_snapshot)
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+
+    async def close(self) -> None:
+        if self._inflight is not None and not self._inflight.done():
+            self._inflight.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -----------------------------------------------------
+    #  Read path
+    # -----------------------------------------------------
+    async def get(self) -> list[Any]:
+        entry = self._entry
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                CATALOG_CACHE.inc(result="fresh")
+                return entry.data
+            if age < self.ttl + self.stale:
+                CATALOG_CACHE.inc(result="stale")
+                self._refresh()
+                return entry.data
+        CATALOG_CACHE.inc(result="miss")
+        try:
+            # shield: a disconnecting caller must not cancel the shared fetch
+            entry = await asyncio.shield(self._refresh())
+        except Exception:
+            if entry is None:
+                raise
+            # Upstream slow or down — keep serving the last good payload
+        return entry.data
+
+    @property
+    def version(self) -> int:
+        entry = self._entry
+        return entry.version if entry is not None else 0
+
+    @property
+    def hash(self) -> str:
+        entry = self._entry
+        return entry.hash if entry is not None else ""
+
+    @property
+    def entry(self) -> CatalogEntry | None:
+        return self._entry
+
+    def invalidate(self) -> None:
+        self._entry = None
+
+    # -----------------------------------------------------
+    #  Refresh paths
+    # -----------------------------------------------------
+    async def refresh(self) -> CatalogEntry:
+        # Revalidate now, whatever the age (joins an in-flight fetch)
+        return await asyncio.shield(self._refresh())
+
+    def _refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._on_refresh_done)
+        return self._inflight
+
+    @staticmethod
+    def _on_refresh_done(task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, CircuitOpenError):
+            # Keep serving the stale payload; the next request retries
+            print(f"Catalog refresh failed: {error!r}")
+
+    def _load_snapshot(self) -> None:
+        snapshot = self.store.get("catalog", self.url)
+        if snapshot is None:
+            return
+        self.restore(
+            snapshot.payload["data"],
+            etag=snapshot.payload.get("etag"),
+            last_modified=snapshot.payload.get("last_modified"),
+            versions=snapshot.payload.get("versions"),
+        )
+
+    def restore(self, data: list[Any], etag: str | None = None, last_modified: str | None = None, versions: dict | None = None) -> None:
+        # Adopt a last good payload (snapshot store, shared catalog file)
+        self.versions.restore(versions)
+        version = self.versions.observe(data)
+        self._entry = CatalogEntry(
+            data=data,
+            etag=etag,
+            last_modified=last_modified,
+            # Served immediately, revalidated on first use
+            fetched_at=time.monotonic() - self.ttl,
+            version=version.version,
+            hash=version.hash,
+        )
+
+    def _save_snapshot(self, entry: CatalogEntry) -> None:
+        self.store.put("catalog", self.url, {
+            "data": entry.data,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "versions": self.versions.state(),
+        }, version=str(entry.version))
+
+    async def _fetch(self) -> CatalogEntry:
+        if self._client is None:
+            await self.start()
+        headers = {}
+        previous = self._entry
+        if previous is not None:
+            if previous.etag:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        self.breaker.check()
+        started = time.perf_counter()
+        response = None
+        try:
+            async with self._client.stream("GET", self.url, headers=headers) as response:
+                CATALOG_FETCH_SECONDS.observe(time.perf_counter() - started, status=str(response.status_code))
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                    response.raise_for_status()
+                self.breaker.record_success()
+
+                if response.status_code == 304 and previous is not None:
+                    entry = CatalogEntry(
+                        data=previous.data,
+                        etag=response.headers.get("ETag", previous.etag),
+                        last_modified=response.headers.get("Last-Modified", previous.last_modified),
+                        fetched_at=time.monotonic(),
+                        version=previous.version,
+                        hash=previous.hash,
+                    )
+                    self._entry = entry
+                    return entry
+                response.raise_for_status()
+                data = await self._read_catalog(response)
+        except httpx.HTTPStatusError:
+            raise
+        except Exception:
+            if response is None:
+                CATALOG_FETCH_SECONDS.observe(time.perf_counter() - started, status="error")
+            # Connect failures and bodies cut off mid-stream alike
+            self.breaker.record_failure()
+            raise
+
+        # Hash off the event loop; large catalogs take a while
+        version = await asyncio.to_thread(self.versions.observe, data)
+        unchanged = previous is not None and previous.version == version.version
+        entry = CatalogEntry(
+            data=previous.data if unchanged else data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.monotonic(),
+            version=version.version,
+            hash=version.hash,
+        )
+        self._entry = entry
+        # Same content → the stored snapshot is still good
+        if self.store is not None and not unchanged:
+            try:
+                await asyncio.to_thread(self._save_snapshot, entry)
+            except Exception as e:
+                print(f"Catalog snapshot write failed: {e!r}")
+        return entry
+
+    @staticmethod
+    async def _read_catalog(response: httpx.Response) -> list[Any]:
+        if not CATALOG_STREAM_PARSE:
+            await response.aread()
+            return normalize_catalog(response.json())
+        # Decoded doc by doc as chunks arrive — the raw body is never held
+        # whole. Parsing runs off the event loop; one chunk can complete a
+        # large value.
+        parser, builder = CatalogParser(), CatalogBuilder()
+        async for chunk in response.aiter_bytes():
+            builder.extend(await asyncio.to_thread(parser.feed, chunk))
+        builder.extend(await asyncio.to_thread(parser.close))
+        return builder.catalog
@@ -0,0 +1,196 @@
+import codecs
+import json
+from typing import Any, Iterable
+
+# ---------------------------------------------------------
+#  Streaming catalog parse
+#
+#  Bytes go in as they arrive (feed / close); events come out as
+#  soon as each piece is complete:
+#
+#      ("doc", position, doc)        one entry of a category's "Docs"
+#      ("category", position, meta)  the category, once it closes —
+#                                    "Docs" emptied, other keys kept
+#
+#  A top-level object is treated as a one-category catalog (like
+#  normalize_catalog). Only the current doc and category metadata
+#  are ever held, never the whole tree.
+# ---------------------------------------------------------
+Event = tuple[str, int, Any]
+DELIMITERS = frozenset(" \t\r\n,:]}")
+
+
+class _NeedMore(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+#  Push parser — json's C scanner decodes one value (key, doc,
+#  metadata value) at a time; only the structure around them is
+#  walked here.
+#
+#  Text that arrives while a value is still incomplete is only
+#  queued; the value is retried once the unparsed text has doubled,
+#  so a huge value costs a few decodes rather than one per chunk.
+# ---------------------------------------------------------
+class CatalogParser:
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()  # tolerate a BOM
+        self._buf = ""
+        self._pos = 0
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._retry_at = 0  # unparsed chars needed before the next attempt
+        self._eof = False
+        self._state = "start"
+        self._single = False
+        self._position = 0
+        self._meta: dict | None = None
+
+    def feed(self, chunk: bytes) -> list[Event]:
+        text = self._utf8.decode(chunk)
+        self._pending.append(text)
+        self._pending_len += len(text)
+        if len(self._buf) - self._pos + self._pending_len < self._retry_at:
+            return []
+        return self._drain()
+
+    def close(self) -> list[Event]:
+        self._pending.append(self._utf8.decode(b"", final=True))
+        self._eof = True
+        events = self._drain()
+        if self._state != "done" or self._buf[self._pos:].strip():
+            raise ValueError("Truncated or malformed catalog JSON")
+        return events
+
+    def _drain(self) -> list[Event]:
+        self._buf = self._buf[self._pos:] + "".join(self._pending)
+        self._pos, self._pending, self._pending_len, self._retry_at = 0, [], 0, 0
+        events: list[Event] = []
+        while self._state != "done":
+            saved = self._pos
+            try:
+                self._step(events)
+            except _NeedMore:
+                # Steps only commit once fully read — retry from the top
+                self._pos = saved
+                self._retry_at = 2 * (len(self._buf) - saved)
+                break
+        return events
+
+    def _peek(self) -> str:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in " \t\r\n":
+            pos += 1
+        self._pos = pos
+        if pos == len(buf):
+            if self._eof:
+                raise ValueError("Unexpected end of catalog JSON")
+            raise _NeedMore
+        return buf[pos]
+
+    def _value(self) -> Any:
+        self._peek()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise
+            raise _NeedMore
+        # "12" / "1." cut at a chunk edge may still become "123" / "1.5"
+        if end == len(self._buf) or self._buf[end] not in DELIMITERS:
+            if not self._eof:
+                raise _NeedMore
+            if end < len(self._buf):
+                raise ValueError(f"Unexpected {self._buf[end]!r} at offset {end} of catalog JSON")
+        self._pos = end
+        return value
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of catalog JSON")
+        self._pos += 1
+
+    def _step(self, events: list[Event]) -> None:
+        state = self._state
+        if state == "start":
+            char = self._peek()
+            if char == "[":
+                self._pos += 1
+                self._state = "first"
+            elif char == "{":
+                self._pos += 1
+                self._single, self._meta, self._state = True, {}, "key_first"
+            else:
+                events.append(("category", 0, self._value()))
+                self._state = "done"
+
+        elif state in ("first", "next"):
+            char = self._peek()
+            if char == "]":
+                self._pos += 1
+                self._state = "done"
+                return
+            if state == "next":
+                self._expect(",")
+                char = self._peek()
+            if char == "{":
+                self._pos += 1
+                self._meta, self._state = {}, "key_first"
+            else:
+                events.append(("category", self._position, self._value()))
+                self._position += 1
+                self._state = "next"
+
+        elif state in ("key_first", "key_next"):
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                events.append(("category", self._position, self._meta))
+                self._position += 1
+                self._meta = None
+                self._state = "done" if self._single else "next"
+                return
+            if state == "key_next":
+                self._expect(",")
+            key = self._value()
+            self._expect(":")
+            if key == "Docs" and self._peek() == "[":
+                self._pos += 1
+                self._meta["Docs"] = []
+                self._state = "docs_first"
+            else:
+                self._meta[key] = self._value()
+                self._state = "key_next"
+
+        elif state in ("docs_first", "docs_next"):
+            char = self._peek()
+            if char == "]":
+                self._pos += 1
+                self._state = "key_next"
+                return
+            if state == "docs_next":
+                self._expect(",")
+            events.append(("doc", self._position, self._value()))
+            self._state = "docs_next"
+
+
+# ---------------------------------------------------------
+#  Sink — rebuilds the catalog list from the events
+# ---------------------------------------------------------
+class CatalogBuilder:
+    def __init__(self):
+        self.catalog: list = []
+        self._docs: list = []
+
+    def extend(self, events: Iterable[Event]) -> None:
+        for kind, _, item in events:
+            if kind == "doc":
+                self._docs.append(item)
+                continue
+            if isinstance(item, dict) and (self._docs or isinstance(item.get("Docs"), list)):
+                item["Docs"] = self._docs
+            self.catalog.append(item)
+            self._docs = []
+
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+# ---------------------------------------------------------
+#  Version history depth — override via environment
+# ---------------------------------------------------------
+CATALOG_HISTORY_VERSIONS = int(os.getenv("CATALOG_HISTORY_VERSIONS", "16"))
+
+
+def doc_hash(doc: Any) -> str:
+    encoded = json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+def iter_doc_keys(catalog: list):
+    # Docs have no id: key by name, "#n" on repeats within one catalog
+    seen: dict[str, int] = {}
+    for category in catalog:
+        if not isinstance(category, dict):
+            continue
+        for doc in category.get("Docs", []) or []:
+            name = str(doc.get("name", "")) if isinstance(doc, dict) else ""
+            seen[name] = seen.get(name, 0) + 1
+            yield (name if seen[name] == 1 else f"{name}#{seen[name]}"), doc
+
+
+@dataclass(frozen=True)
+class CatalogVersion:
+    version: int
+    hash: str
+    doc_hashes: dict[str, str]
+
+
+# ---------------------------------------------------------
+#  Content-addressed catalog versions
+#
+#  Every payload gets per-doc hashes and one catalog hash (category
+#  metadata + doc hashes, in order). Identical content keeps its
+#  version; anything else bumps it by one. The last few versions'
+#  doc hashes are kept so diff(since) can list exactly which docs
+#  were added, changed or removed.
+# ---------------------------------------------------------
+class CatalogVersions:
+    def __init__(self, history: int = CATALOG_HISTORY_VERSIONS):
+        self.history = history
+        self.current: CatalogVersion | None = None
+        self._versions: OrderedDict[int, CatalogVersion] = OrderedDict()
+        self._docs: dict[str, Any] = {}
+        self._source: Any = None
+        self._lock = threading.Lock()
+
+    def observe(self, catalog: list) -> CatalogVersion:
+        with self._lock:
+            if catalog is self._source and self.current is not None:
+                return self.current
+
+        docs = dict(iter_doc_keys(catalog))
+        doc_hashes = {key: doc_hash(doc) for key, doc in docs.items()}
+        digest = hashlib.blake2b(digest_size=16)
+        for category in catalog:
+            meta = {k: v for k, v in category.items() if k != "Docs"} if isinstance(category, dict) else category
+            digest.update(doc_hash(meta).encode())
+        for key, value in doc_hashes.items():
+            digest.update(f"{key}\x1f{value}\x1e".encode())
+        content_hash = digest.hexdigest()
+
+        with self._lock:
+            current = self.current
+            if current is None or current.hash != content_hash:
+                current = CatalogVersion((current.version + 1) if current else 1, content_hash, doc_hashes)
+                self._remember(current)
+            self._source, self._docs = catalog, docs
+            return current
+
+    def _remember(self, version: CatalogVersion) -> None:
+        self.current = version
+        self._versions[version.version] = version
+        while len(self._versions) > self.history:
+            self._versions.popitem(last=False)
+
+    # -----------------------------------------------------
+    #  Persistence — the current version rides along with the
+    #  catalog snapshot, so numbering survives restarts
+    # -----------------------------------------------------
+    def state(self) -> dict | None:
+        current = self.current
+        if current is None:
+            return None
+        return {"version": current.version, "hash": current.hash, "doc_hashes": current.doc_hashes}
+
+    def restore(self, state: dict | None) -> None:
+        if not state:
+            return
+        with self._lock:
+            if self.current is None or self.current.version < state["version"]:
+                self._remember(CatalogVersion(state["version"], state["hash"], state.get("doc_hashes", {})))
+
+    # -----------------------------------------------------
+    #  Diff against an older version. Unknown (expired or future)
+    #  versions get the whole catalog as "added" with full=True.
+    #  "added" / "changed" hold the (projected) docs; "removed" only
+    #  has their keys — the doc name, "name#2" for a repeated name —
+    #  since there is no doc left to send.
+    # -----------------------------------------------------
+    def diff(self, since: int, fields: list[str] | None = None) -> dict:
+        with self._lock:
+            current, docs = self.current, self._docs
+            base = self._versions.get(since)
+
+        def project(doc: Any) -> Any:
+            if fields and isinstance(doc, dict):
+                return {field: doc[field] for field in fields if field in doc}
+            return doc
+
+        result = {
+            "version": current.version if current else 0,
+            "hash": current.hash if current else None,
+            "since": since,
+            "full": base is None,
+            "added": [],
+            "changed": [],
+            "removed": [],
+        }
+        if current is None:
+            return result
+        if base is None:
+            result["added"] = [project(doc) for doc in docs.values()]
+            return result
+        for key, value in current.doc_hashes.items():
+            previous = base.doc_hashes.get(key)
+            if previous is None:
+                result["added"].append(project(docs[key]))
+            elif previous != value:
+                result["changed"].append(project(docs[key]))
+        result["removed"] = [key for key in base.doc_hashes if key not in current.doc_hashes]
+        return result
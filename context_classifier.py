@@ -0,0 +1,223 @@
+import json
+import math
+import os
+import random
+import threading
+from collections import Counter, defaultdict
+from typing import Callable
+
+from caching import normalize_query
+
+LABELS = ("anxiety", "depression", "sud", "youth-bh", "general")
+
+# ---------------------------------------------------------
+#  Tiered classifier tuning — override via environment
+# ---------------------------------------------------------
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+CLASSIFIER_LOG_PATH = os.getenv("CLASSIFIER_LOG_PATH")  # (query, LLM label) JSONL; unset → no logging
+NB_MIN_EXAMPLES = int(os.getenv("NB_MIN_EXAMPLES", "200"))
+CLASSIFIER_SHADOW_RATE = float(os.getenv("CLASSIFIER_SHADOW_RATE", "0.05"))  # confident answers re-checked by the LLM
+
+# Keywords match whole tokens; a trailing "*" marks a stem that matches
+# by prefix ("worr*" → worry / worried / worrying). Only stems that can't
+# collide with everyday words get a "*" — "kid" must not match "kidney",
+# nor "child" "childhood".
+# Weight 2 = unambiguous on its own, 1 = supporting evidence.
+KEYWORD_WEIGHTS = {
+    "sud": {
+        "alcohol*": 2, "drug": 2, "drugs": 2, "substance": 2, "substances": 2, "sud": 2, "overus*": 2,
+        "opioid*": 2, "addict*": 2, "drink*": 1, "drunk": 2, "sober": 2, "sobriety": 2, "relaps*": 2,
+    },
+    "anxiety": {
+        "anxiety": 2, "anxieties": 2, "anxious": 2, "panic*": 2, "worr*": 2, "stress*": 2,
+        "nervous*": 1, "overwhelm*": 1,
+    },
+    "depression": {
+        "depress*": 2, "hopeless*": 2, "sad": 1, "sadness": 1, "mood": 1, "moods": 1, "down": 1,
+        "motivation": 1, "lonely": 1, "loneliness": 1,
+    },
+    "youth-bh": {
+        "youth": 2, "youths": 2, "teen": 2, "teens": 2, "teenage*": 2, "adolescen*": 2, "child": 2,
+        "children": 2, "kid": 2, "kids": 2, "ybh": 2, "young": 1, "son": 1, "sons": 1,
+        "daughter": 1, "daughters": 1,
+    },
+}
+
+def ngrams(query: str) -> list[str]:
+    tokens = normalize_query(query).split()
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+# ---------------------------------------------------------
+#  Local model 1: scored keyword model (no training needed)
+#
+#  confidence = share of the winning label × saturation, so one
+#  strong hit ("alcohol") is confident and mixed signals
+#  ("youth anxiety") fall through to the LLM.
+# ---------------------------------------------------------
+class KeywordModel:
+    name = "keyword"
+
+    def __init__(self, weights: dict[str, dict[str, float]] = KEYWORD_WEIGHTS):
+        self.weights = weights
+        self.exact: dict[str, dict[str, float]] = defaultdict(dict)  # token → {label: weight}
+        self.stems: list[tuple[str, str, float]] = []
+        for label, keywords in weights.items():
+            for keyword, weight in keywords.items():
+                if keyword.endswith("*"):
+                    self.stems.append((keyword[:-1], label, weight))
+                else:
+                    self.exact[keyword][label] = weight
+
+    def predict(self, query: str) -> tuple[str, float]:
+        scores: Counter[str] = Counter()
+        for token in normalize_query(query).split():
+            hits = dict(self.exact.get(token, {}))
+            for stem, label, weight in self.stems:
+                if label not in hits and token.startswith(stem):
+                    hits[label] = weight
+            scores.update(hits)
+        if not scores:
+            return "general", 0.0
+        label, top = scores.most_common(1)[0]
+        total = sum(scores.values())
+        return label, (top / total) * min(1.0, top / 2)
+
+
+# ---------------------------------------------------------
+#  Local model 2: multinomial naive Bayes over unigrams +
+#  bigrams, trained from logged (query, LLM label) pairs
+# ---------------------------------------------------------
+class NaiveBayesModel:
+    name = "naive-bayes"
+
+    def __init__(self, examples: list[tuple[str, str]], alpha: float = 1.0):
+        self.alpha = alpha
+        self.label_counts: Counter[str] = Counter()
+        self.feature_counts: dict[str, Counter[str]] = defaultdict(Counter)
+        for query, label in examples:
+            self.label_counts[label] += 1
+            self.feature_counts[label].update(ngrams(query))
+        self.vocab = {f for counts in self.feature_counts.values() for f in counts}
+        self.totals = {label: sum(counts.values()) for label, counts in self.feature_counts.items()}
+        self.n = sum(self.label_counts.values())
+
+    @classmethod
+    def from_log(cls, path: str | None, min_examples: int = NB_MIN_EXAMPLES) -> "NaiveBayesModel | None":
+        if not path or not os.path.exists(path):
+            return None
+        examples = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("label") in LABELS:
+                    examples.append((record["query"], record["label"]))
+        return cls(examples) if len(examples) >= min_examples else None
+
+    def predict(self, query: str) -> tuple[str, float]:
+        features = ngrams(query)
+        vocab_size = len(self.vocab) + 1
+        log_probs = {}
+        for label, count in self.label_counts.items():
+            counts = self.feature_counts[label]
+            denominator = self.totals[label] + self.alpha * vocab_size
+            log_probs[label] = math.log(count / self.n) + sum(
+                math.log((counts[f] + self.alpha) / denominator) for f in features
+            )
+        top = max(log_probs.values())
+        posterior = {label: math.exp(lp - top) for label, lp in log_probs.items()}
+        label = max(posterior, key=posterior.get)
+        return label, posterior[label] / sum(posterior.values())
+
+
+# ---------------------------------------------------------
+#  Tiered classifier: local model first, LLM below threshold
+#
+#  Every LLM fallback records whether the local guess agreed,
+#  bucketed by local confidence, so the threshold can be tuned
+#  from stats() — and logs (query, label) for NB retraining.
+#  A CLASSIFIER_SHADOW_RATE share of confident local answers is
+#  also re-checked by the LLM in the background, so the buckets
+#  above the threshold get measured too.
+# ---------------------------------------------------------
+class TieredClassifier:
+    def __init__(
+        self,
+        llm_classify: Callable[[str], str],
+        threshold: float = LOCAL_CLASSIFIER_THRESHOLD,
+        log_path: str | None = CLASSIFIER_LOG_PATH,
+        shadow_rate: float = CLASSIFIER_SHADOW_RATE,
+    ):
+        self.llm_classify = llm_classify
+        self.threshold = threshold
+        self.log_path = log_path
+        self.shadow_rate = shadow_rate
+        self.model = NaiveBayesModel.from_log(log_path) or KeywordModel()
+        self.local_answers = 0
+        self.llm_answers = 0
+        self.llm_failures = 0
+        self.shadow_checks = 0
+        self.agreement: dict[float, list[int]] = defaultdict(lambda: [0, 0])  # bucket → [agree, total]
+        self._lock = threading.Lock()
+
+    def classify(self, query: str) -> str:
+        label, confidence = self.model.predict(query)
+        if confidence >= self.threshold:
+            self.local_answers += 1
+            if random.random() < self.shadow_rate:
+                # Off the request path: the member gets the local label either way
+                threading.Thread(target=self._shadow, args=(query, label, confidence), daemon=True).start()
+            return label
+
+        try:
+            llm_label = self.llm_classify(query)
+        except Exception as e:
+            # LLM slow / down / out of deadline: the local guess beats no answer
+            print(f"LLM classification failed, using local label: {e!r}")
+            self.llm_failures += 1
+            return label
+        self._record(query, label, confidence, llm_label)
+        with self._lock:
+            self.llm_answers += 1
+        return llm_label
+
+    def _shadow(self, query: str, label: str, confidence: float) -> None:
+        try:
+            llm_label = self.llm_classify(query)
+        except Exception as e:
+            print(f"Shadow classification failed: {e!r}")
+            return
+        self._record(query, label, confidence, llm_label)
+        with self._lock:
+            self.shadow_checks += 1
+
+    def _record(self, query: str, label: str, confidence: float, llm_label: str) -> None:
+        bucket = math.floor(confidence * 10) / 10
+        with self._lock:
+            self.agreement[bucket][0] += label == llm_label
+            self.agreement[bucket][1] += 1
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"query": query, "label": llm_label, "local": label,
+                                        "confidence": round(confidence, 4)}) + "\n")
+
+    def retrain(self) -> None:
+        self.model = NaiveBayesModel.from_log(self.log_path) or self.model
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model.name,
+            "threshold": self.threshold,
+            "local_answers": self.local_answers,
+            "llm_answers": self.llm_answers,
+            "llm_failures": self.llm_failures,
+            "shadow_rate": self.shadow_rate,
+            "shadow_checks": self.shadow_checks,
+            "agreement_by_confidence": {
+                f"{bucket:.1f}": {"agree": agree, "total": total, "rate": agree / total}
+                for bucket, (agree, total) in sorted(self.agreement.items())
+            },
+        }
@@ -0,0 +1,129 @@
+import hashlib
+
+# ---------------------------------------------------------
+#  Context → keyword table (shared by every client)
+# ---------------------------------------------------------
+CONTEXT_KEYWORDS = {
+    "sud":        ["substance", "sud", "drug", "alcohol"],
+    "anxiety":    ["anxiety", "stress", "mental health"],
+    "depression": ["depression", "mood", "mental health"],
+    "youth-bh":   ["youth", "ybh", "young", "adolescent"],
+    "general":    []
+}
+KEYWORDS = sorted({kw for kws in CONTEXT_KEYWORDS.values() for kw in kws})
+
+
+def docs_fingerprint(docs: list) -> str:
+    # Only name/description (and order) feed the index
+    digest = hashlib.blake2b(digest_size=16)
+    for doc in docs:
+        digest.update(str(doc.get("name", "")).encode())
+        digest.update(b"\x1e")
+        digest.update(str(doc.get("description", "")).encode())
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------
+#  Inverted keyword index over one catalog version
+#
+#  Each doc's name/description is lowercased once at build time;
+#  keyword → doc ids and context → doc ids are precomputed, so a
+#  query-time filter is a list lookup. Keyword matches are kept per
+#  (name, description), so a rebuild from `previous` only scans the
+#  docs that were added or changed.
+# ---------------------------------------------------------
+class DocIndex:
+    def __init__(self, docs: list, version: str | None = None, previous: "DocIndex | None" = None):
+        self.version = version or docs_fingerprint(docs)
+        self.docs = docs
+
+        known = previous.doc_keywords if previous is not None else {}
+        self.doc_keywords: dict[tuple[str, str], tuple[str, ...]] = {}
+        self.by_keyword: dict[str, list[int]] = {kw: [] for kw in KEYWORDS}
+        for i, doc in enumerate(docs):
+            key = (doc.get("name") or "", doc.get("description") or "")
+            matched = self.doc_keywords.get(key, known.get(key))
+            if matched is None:
+                name, description = key[0].lower(), key[1].lower()
+                matched = tuple(kw for kw in KEYWORDS if kw in name or kw in description)
+            self.doc_keywords[key] = matched
+            for kw in matched:
+                self.by_keyword[kw].append(i)
+        self.by_context: dict[str, list[int]] = {
+            context: sorted({i for kw in kws for i in self.by_keyword[kw]})
+            for context, kws in CONTEXT_KEYWORDS.items()
+        }
+
+    def doc_ids(self, context: str) -> list[int]:
+        # Unknown/keyword-less contexts and empty matches fall back to all docs
+        return self.by_context.get(context) or list(range(len(self.docs)))
+
+    def filter(self, context: str, docs: list | None = None) -> list:
+        docs = self.docs if docs is None else docs
+        return [docs[i] for i in self.doc_ids(context)]
+
+
+_current: DocIndex | None = None
+
+
+def get_doc_index(docs: list, version: str | None = None) -> DocIndex:
+    """Return the index for `docs`, rebuilding only when the catalog changed."""
+    global _current
+    index = _current
+    if index is not None and (docs is index.docs or (version or docs_fingerprint(docs)) == index.version):
+        return index
+    index = DocIndex(docs, version, previous=index)
+    _current = index
+    return index
+
+
+def filter_docs(all_docs: list, context: str, version: str | None = None) -> list:
+    return get_doc_index(all_docs, version).filter(context, all_docs)
+
+
+# ---------------------------------------------------------
+#  Whole-catalog view for server-side filtering
+#
+#  Flattens every category's "Docs" once per catalog object so
+#  context / field projection / limit are cheap per request.
+# ---------------------------------------------------------
+class CatalogIndex:
+    def __init__(self, catalog: list, previous: "CatalogIndex | None" = None):
+        self.catalog = catalog
+        docs, owners = [], []
+        for position, category in enumerate(catalog):
+            if isinstance(category, dict):
+                for doc in category.get("Docs", []) or []:
+                    docs.append(doc)
+                    owners.append(position)
+        self.index = DocIndex(docs, previous=previous.index if previous is not None else None)
+        self.owners = owners
+
+    def select(self, context: str | None = None, fields: list[str] | None = None, limit: int | None = None) -> list:
+        ids = self.index.doc_ids(context) if context else range(len(self.index.docs))
+        if limit is not None:
+            ids = ids[:limit]
+        grouped: dict[int, list] = {position: [] for position in range(len(self.catalog))}
+        for i in ids:
+            doc = self.index.docs[i]
+            if fields:
+                doc = {field: doc[field] for field in fields if field in doc}
+            grouped[self.owners[i]].append(doc)
+        return [
+            {**category, "Docs": grouped[position]} if isinstance(category, dict) else category
+            for position, category in enumerate(self.catalog)
+        ]
+
+
+_current_catalog: CatalogIndex | None = None
+
+
+def get_catalog_index(catalog: list) -> CatalogIndex:
+    """Return the index for this catalog object, rebuilding after a refresh."""
+    global _current_catalog
+    index = _current_catalog
+    if index is None or index.catalog is not catalog:
+        index = CatalogIndex(catalog, previous=index)
+        _current_catalog = index
+    return index
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+
+from caching import normalize_query
+from doc_index import CONTEXT_KEYWORDS
+
+# ---------------------------------------------------------
+#  Projection tuning — override via environment
+# ---------------------------------------------------------
+SUMMARY_DOC_TOKEN_BUDGET = int(os.getenv("SUMMARY_DOC_TOKEN_BUDGET", "1500"))
+SHORT_DESCRIPTION_CHARS = int(os.getenv("SHORT_DESCRIPTION_CHARS", "160"))
+CHARS_PER_TOKEN = 4  # rough estimate for English JSON
+
+LINK_FIELDS = ("onEnglishAction", "onEnglishEmailSave", "onEnglishVideoAction")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def doc_link(doc: dict) -> str | None:
+    for field in LINK_FIELDS:
+        if doc.get(field):
+            return doc[field]
+    return None
+
+
+def short_description(text: str, limit: int = SHORT_DESCRIPTION_CHARS) -> str:
+    text = " ".join(str(text or "").split())
+    text = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def project_doc(doc: dict) -> dict:
+    # Only what the summarizer uses: name, short description, first link
+    projected = {"name": doc.get("name") or ""}
+    description = short_description(doc.get("description"))
+    if description:
+        projected["description"] = description
+    link = doc_link(doc)
+    if link:
+        projected["link"] = link
+    return projected
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# ---------------------------------------------------------
+#  Ranking: query-term overlap + context keyword hits.
+#  Stable, so ties keep merge order (curated resource docs first).
+# ---------------------------------------------------------
+def rank_docs(docs: list, member_query: str, context: str) -> list:
+    terms = set(normalize_query(member_query).split())
+    keywords = CONTEXT_KEYWORDS.get(context, [])
+
+    def score(doc: dict) -> int:
+        text = f"{doc.get('name') or ''} {doc.get('description') or ''}".lower()
+        return len(terms & set(normalize_query(text).split())) + 2 * sum(kw in text for kw in keywords)
+
+    return sorted(docs, key=score, reverse=True)
+
+
+def compact_docs(docs: list, member_query: str = "", context: str = "", token_budget: int = SUMMARY_DOC_TOKEN_BUDGET) -> str:
+    """Rank, project and serialize docs compactly, stopping at the token budget."""
+    items: list[str] = []
+    used = 2  # "[" + "]"
+    for doc in rank_docs(docs, member_query, context):
+        item = json.dumps(project_doc(doc), ensure_ascii=False, separators=(",", ":"))
+        cost = estimate_tokens(item)
+        if items and used + cost > token_budget:
+            break
+        items.append(item)
+        used += cost
+    return "[" + ",".join(items) + "]"
@@ -1,56 +1,84 @@
-import json
+import asyncio
+import os
 import sys
-import uuid
-import requests
-from typing import Any
-from pydantic import RootModel
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
 import anthropic
+from caching import ClassificationCache, ResponseCache, fingerprint
+from context_classifier import TieredClassifier
+from doc_projection import LINK_FIELDS, compact_docs
+from mcp_gateway import MCPClient
+from mcp_models import CatalogToolResult, PromptResult, RPCResponse, ResourceResult
+from mcp_registry import CapabilityRegistry
+from metrics import PIPELINE_STEP_SECONDS, SUMMARY_CACHE, span
+from resilience import PIPELINE_DEADLINE_SECONDS, deadline, remaining, time_left
+from retrieval_index import retrieve_docs
+from snapshot_store import SNAPSHOT_DB_PATH, SnapshotCache, SnapshotStore
 
 sys.stdout.reconfigure(encoding="utf-8")
 
 from dotenv import load_dotenv
-load_dotenv()  # ← must be before anthropic.Anthropic()
 
-MCP_URL = "http://localhost:4444/mcp/fd477fc295cf488da8c16219e2af894b"
-claude = anthropic.Anthropic()  # reads ANTHROPIC_API_KEY from env
+# ---------------------------------------------------------
+#  Anthropic client — created on first use (or by warm_pipeline)
+#  and reused; importing this module does no network setup
+# ---------------------------------------------------------
+_claude: anthropic.Anthropic | None = None
+# Per-call cap; the pipeline deadline can cut it shorter
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+
+def get_claude() -> anthropic.Anthropic:
+    global _claude
+    if _claude is None:
+        load_dotenv()  # ← must be before anthropic.Anthropic()
+        _claude = anthropic.Anthropic()  # reads ANTHROPIC_API_KEY from env
+    return _claude
+
+
+def claude_call_options() -> dict:
+    # Inside a deadline the SDK's own retries would overrun it — fail fast instead
+    options = {"timeout": time_left(LLM_TIMEOUT_SECONDS)}
+    if remaining() is not None:
+        options["max_retries"] = 0
+    return options
+
+
+def deadline_claude() -> anthropic.Anthropic:
+    return get_claude().with_options(**claude_call_options())
 
 
 # ---------------------------------------------------------
-#  Pydantic passthrough model
+#  MCP client (pooled keep-alive session, batch-capable)
 # ---------------------------------------------------------
-class MCPResponse(RootModel[Any]):
-    pass
+mcp = MCPClient()
+
+# tools/prompts/resources lists (CAPABILITY_TTL_SECONDS) and
+# precompiled outputSchema validators
+capabilities = CapabilityRegistry(mcp)
 
 
 # ---------------------------------------------------------
-#  MCP call wrapper
+#  Classification memo (LRU + TTL, optional SQLite tier via
+#  CLASSIFICATION_CACHE_DB)
 # ---------------------------------------------------------
-def mcp_call(method: str, params: dict | None = None):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": method,
-        "params": params or {}
-    }
-    response = requests.post(
-        MCP_URL,
-        data=json.dumps(payload),
-        headers={"Accept": "application/json", "Content-Type": "application/json"}
-    )
-    try:
-        return MCPResponse.model_validate(response.json())
-    except Exception as e:
-        return response.json()
+classification_cache = ClassificationCache()
 
 
 # ---------------------------------------------------------
 #  LLM Step 1: Detect context from member query
 # ---------------------------------------------------------
 def detect_context_llm(member_query: str) -> str:
-    response = claude.messages.create(
-        model="claude-sonnet-4-6",
-        max_tokens=100,
-        system="""You are a behavioral health context classifier.
+    cached = classification_cache.get(member_query)
+    if cached is not None:
+        return cached
+
+    with span(PIPELINE_STEP_SECONDS, step="detect_context_llm"):
+        response = deadline_claude().messages.create(
+            model="claude-sonnet-4-6",
+            max_tokens=100,
+            system="""You are a behavioral health context classifier.
 Given a member query, return ONLY one of these exact values:
 - anxiety
 - depression  
@@ -59,21 +87,50 @@ Given a member query, return ONLY one of these exact values:
 - general
 
 Return just the single word/phrase, nothing else.""",
-        messages=[
-            {"role": "user", "content": member_query}
-        ]
-    )
+            messages=[
+                {"role": "user", "content": member_query}
+            ]
+        )
     context = response.content[0].text.strip().lower()
     # Validate it's one of the allowed values
     allowed = ["anxiety", "depression", "sud", "youth-bh", "general"]
-    return context if context in allowed else "general"
+    context = context if context in allowed else "general"
+    classification_cache.put(member_query, context)
+    return context
+
+
+# ---------------------------------------------------------
+#  Tiered context detection: local model when confident,
+#  detect_context_llm otherwise (LOCAL_CLASSIFIER_THRESHOLD)
+# ---------------------------------------------------------
+context_classifier = TieredClassifier(detect_context_llm)
+
+
+def detect_context(member_query: str) -> str:
+    with span(PIPELINE_STEP_SECONDS, step="classify"):
+        return context_classifier.classify(member_query)
 
 
 # ---------------------------------------------------------
 #  LLM Step 2: Summarize docs into member-friendly response
 # ---------------------------------------------------------
-def summarize_docs_llm(member_query: str, context: str, docs: list, prompt_text: str = "") -> str:
-    docs_text = json.dumps(docs, indent=2)
+# Static system prompt — marked for Anthropic prompt caching so
+# repeated summaries reuse the cached prefix
+ADVISOR_SYSTEM_PROMPT = [{
+    "type": "text",
+    "text": """You are a compassionate BCBSNC benefits advisor helping members
+find behavioral health resources. Given the member's concern and a list of
+available resources, provide a warm, helpful response that:
+1. Acknowledges their concern briefly
+2. Lists the most relevant 2-3 resources with their links
+3. Encourages them to reach out for help""",
+    "cache_control": {"type": "ephemeral"},
+}]
+
+
+def summary_request(member_query: str, context: str, docs: list, prompt_text: str = "") -> dict:
+    # Ranked, projected (name/description/link) and cut to SUMMARY_DOC_TOKEN_BUDGET
+    docs_text = compact_docs(docs, member_query, context)
     if prompt_text:
         # Use the MCP prompt as the user message, append docs to it
         user_content = f"{prompt_text}\n\nAvailable resources:\n{docs_text}"
@@ -83,173 +140,557 @@ Context: {context}
 Available resources: {docs_text}
 
 Please provide a helpful response for this member."""
-    response = claude.messages.create(
+    return dict(
         model="claude-sonnet-4-6",
         max_tokens=500,
-        system="""You are a compassionate BCBSNC benefits advisor helping members
-find behavioral health resources. Given the member's concern and a list of
-available resources, provide a warm, helpful response that:
-1. Acknowledges their concern briefly
-2. Lists the most relevant 2-3 resources with their links
-3. Encourages them to reach out for help""",
+        system=ADVISOR_SYSTEM_PROMPT,
         messages=[{"role": "user", "content": user_content}]
     )
+
+
+def summarize_docs_llm(member_query: str, context: str, docs: list, prompt_text: str = "") -> str:
+    with span(PIPELINE_STEP_SECONDS, step="summarize"):
+        response = deadline_claude().messages.create(**summary_request(member_query, context, docs, prompt_text))
     return response.content[0].text
 
 
+def summarize_docs_llm_stream(member_query: str, context: str, docs: list, prompt_text: str = "") -> Iterator[str]:
+    # Same request as summarize_docs_llm, but yields text deltas as they arrive
+    started = time.perf_counter()
+    first = True
+    with span(PIPELINE_STEP_SECONDS, step="summarize_stream"):
+        with deadline_claude().messages.stream(**summary_request(member_query, context, docs, prompt_text)) as stream:
+            for text in stream.text_stream:
+                if first:
+                    PIPELINE_STEP_SECONDS.observe(time.perf_counter() - started, step="summarize_first_token")
+                    first = False
+                yield text
+
+
 # ---------------------------------------------------------
-#  Change this to test different member queries
+#  MCP requests used by the member-query pipeline
 # ---------------------------------------------------------
-MEMBER_QUERY = "I've been feeling really down lately and can't find motivation"
+PROMPT_NAME = "behavioral-health-context-router"
+TOOL_NAME = "employerassestfastapi-local"
 
 
-# ==========================================================
-#  STEP 1: LLM detects context (replaces keyword matching)
-# ==========================================================
-print("=" * 60)
-print("STEP 1: LLM detecting context from member query")
-print("=" * 60)
-print(f"Member query: {MEMBER_QUERY}")
+# Each builder returns (method, params, result type) for mcp.call / mcp.batch
+def prompt_request(member_query: str, context: str) -> tuple[str, dict, type]:
+    return ("prompts/get", {
+        "name": PROMPT_NAME,
+        "arguments": {
+            "member_query": member_query,
+            "context": context
+        }
+    }, PromptResult)
 
-context = detect_context_llm(MEMBER_QUERY)
-print(f"✅ LLM detected context: '{context}'")
 
+def resource_request(context: str) -> tuple[str, dict, type]:
+    return ("resources/read", {
+        "uri": f"resource://bcbsnc/{context}"
+    }, ResourceResult)
 
-# ==========================================================
-#  STEP 2: Get prompt from MCP
-# ==========================================================
-print("=" * 60)
-print("STEP 2: Getting prompt from MCP")
-print("=" * 60)
 
-prompt_result = mcp_call("prompts/get", {
-    "name": "behavioral-health-context-router",
-    "arguments": {
-        "member_query": MEMBER_QUERY,
-        "context": context
-    }
-})
-messages = []
-prompt_text = ""
-try:
-    raw = prompt_result.root
-    # Check for MCP-level error first
-    if raw.get("error"):
-        print(f"❌ MCP error: {raw['error']}")
+# Only the fields retrieval + summarization read; the endpoint projects
+# server-side (context / fields / limit map to /behavior-health params)
+TOOL_FIELDS = ",".join(("name", "description") + LINK_FIELDS)
+
+
+def tool_request(context: str | None = None, fields: str | None = TOOL_FIELDS, limit: int | None = None) -> tuple[str, dict, type]:
+    arguments = {"context": context, "fields": fields, "limit": limit}
+    return ("tools/call", {
+        "name": TOOL_NAME,
+        "arguments": {k: v for k, v in arguments.items() if v is not None}
+    }, CatalogToolResult)
+
+
+# ---------------------------------------------------------
+#  Response parsing — results arrive already decoded (embedded
+#  JSON included); raise on anything unexpected so the pipeline
+#  can record which step failed
+# ---------------------------------------------------------
+def parse_prompt_text(prompt_result: RPCResponse[PromptResult]) -> str:
+    messages = prompt_result.unwrap().messages
+    if not messages:
+        raise RuntimeError("0 messages returned")
+    return messages[0].content.text
+
+
+def parse_resource_docs(resource_result: RPCResponse[ResourceResult]) -> list:
+    contents = resource_result.unwrap().contents
+    # The last content block wins, as before
+    return contents[-1].text.docs if contents else []
+
+
+def parse_tool_docs(tool_result: RPCResponse[CatalogToolResult]) -> list:
+    result = tool_result.unwrap()
+    docs = result.docs()
+    # Once per catalog hash / text hash, not per query
+    capabilities.validate_tool_output(TOOL_NAME, result.payload(), result.content_key())
+    return docs
+
+
+# Last good tool docs — served when the gateway is down or the circuit is open,
+# and for every call that reports the same catalog content hash (whichever
+# worker served it), so the retrieval and keyword indexes see the same list
+# and skip re-hashing it
+_last_tool_docs: list | None = None
+_last_tool_hash: str | None = None
+
+
+def parse_tool_docs_or_last(tool_result: RPCResponse[CatalogToolResult]) -> list:
+    global _last_tool_docs, _last_tool_hash
+    try:
+        result = tool_result.unwrap()
+        content_hash = result.catalog_hash()
+        if content_hash is not None and content_hash == _last_tool_hash and not result.isError:
+            return _last_tool_docs
+        docs = parse_tool_docs(tool_result)
+    except Exception:
+        if _last_tool_docs is None:
+            raise
+        return _last_tool_docs
+    _last_tool_docs, _last_tool_hash = docs, content_hash
+    return docs
+
+
+def tool_docs_version(docs: list) -> str | None:
+    return _last_tool_hash if docs is _last_tool_docs else None
+
+
+def fetch_tool_docs() -> list:
+    try:
+        tool_result = mcp.call(*tool_request())
+    except Exception:
+        if _last_tool_docs is None:
+            raise
+        return _last_tool_docs
+    return parse_tool_docs_or_last(tool_result)
+
+
+# ---------------------------------------------------------
+#  Snapshot-first prompt templates and resource docs
+#
+#  Both only depend on the context, so they are read from the local
+#  snapshot store (SNAPSHOT_DB_PATH) and refreshed in the background.
+#  Prompts are rendered once per context with a placeholder query and
+#  stored as templates; the member query is substituted locally. A
+#  template whose placeholder didn't come back intact is never stored,
+#  and without a snapshot store prompts/get gets the real query.
+# ---------------------------------------------------------
+PROMPT_QUERY_PLACEHOLDER = "{{member_query}}"
+
+snapshot_store = SnapshotStore(SNAPSHOT_DB_PATH) if SNAPSHOT_DB_PATH else None
+prompt_snapshots = SnapshotCache(snapshot_store, "prompt") if snapshot_store else None
+resource_snapshots = SnapshotCache(snapshot_store, "resource") if snapshot_store else None
+
+
+class PromptTemplateError(RuntimeError):
+    pass
+
+
+def check_prompt_template(template: str) -> str:
+    if PROMPT_QUERY_PLACEHOLDER not in template:
+        raise PromptTemplateError(f"{PROMPT_NAME} did not keep the {PROMPT_QUERY_PLACEHOLDER} placeholder")
+    return template
+
+
+def fetch_prompt_template(context: str) -> str:
+    return check_prompt_template(parse_prompt_text(mcp.call(*prompt_request(PROMPT_QUERY_PLACEHOLDER, context))))
+
+
+def fetch_prompt_text(member_query: str, context: str) -> str:
+    return parse_prompt_text(mcp.call(*prompt_request(member_query, context)))
+
+
+def prompt_version(text: str, member_query: str) -> str:
+    # Same template → same version, whichever query it was rendered with
+    return fingerprint(text.replace(member_query, PROMPT_QUERY_PLACEHOLDER) if member_query else text)
+
+
+def fetch_resource_docs(context: str) -> list:
+    return parse_resource_docs(mcp.call(*resource_request(context)))
+
+
+def render_prompt(template: str, member_query: str) -> str:
+    return template.replace(PROMPT_QUERY_PLACEHOLDER, member_query)
+
+
+def peek_prompt_template(context: str) -> str | None:
+    if prompt_snapshots is None:
+        return None
+    template = prompt_snapshots.peek(f"{PROMPT_NAME}/{context}", lambda: fetch_prompt_template(context))
+    return template if template is not None and PROMPT_QUERY_PLACEHOLDER in template else None
+
+
+def peek_resource_docs(context: str) -> list | None:
+    if resource_snapshots is None:
+        return None
+    return resource_snapshots.peek(f"resource://bcbsnc/{context}", lambda: fetch_resource_docs(context))
+
+
+def store_prompt_template(context: str, template: str) -> None:
+    if prompt_snapshots is not None:
+        prompt_snapshots.put(f"{PROMPT_NAME}/{context}", template)
+
+
+def store_resource_docs(context: str, docs: list) -> None:
+    if resource_snapshots is not None:
+        resource_snapshots.put(f"resource://bcbsnc/{context}", docs)
+
+
+def get_prompt_template(context: str) -> str:
+    template = peek_prompt_template(context)
+    if template is None:
+        template = fetch_prompt_template(context)
+        store_prompt_template(context, template)
+    return template
+
+
+def get_prompt(member_query: str, context: str) -> tuple[str, str]:
+    """Prompt text for the query, and the version of its template."""
+    if prompt_snapshots is not None:
+        try:
+            template = get_prompt_template(context)
+            return render_prompt(template, member_query), fingerprint(template)
+        except PromptTemplateError as e:
+            print(f"{e}; fetching the prompt per query")
+    text = fetch_prompt_text(member_query, context)
+    return text, prompt_version(text, member_query)
+
+
+def get_prompt_text(member_query: str, context: str) -> str:
+    return get_prompt(member_query, context)[0]
+
+
+def get_resource_docs(context: str) -> list:
+    docs = peek_resource_docs(context)
+    if docs is None:
+        docs = fetch_resource_docs(context)
+        store_resource_docs(context, docs)
+    return docs
+
+
+def merge_docs(resource_docs: list, tool_docs: list) -> list:
+    existing_names = {doc["name"] for doc in resource_docs}
+    additional_docs = [doc for doc in tool_docs if doc["name"] not in existing_names]
+    return resource_docs + additional_docs
+
+
+# ---------------------------------------------------------
+#  Pipeline result
+# ---------------------------------------------------------
+@dataclass
+class PipelineResult:
+    member_query: str
+    context: str = "general"
+    prompt_text: str = ""
+    prompt_version: str = ""
+    resource_docs: list = field(default_factory=list)
+    tool_docs: list = field(default_factory=list)
+    final_docs: list = field(default_factory=list)
+    response: str = ""
+    cached: bool = False
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+# ---------------------------------------------------------
+#  Final-response cache — summarize_docs_llm answers for the same
+#  context, prompt template, merged docs and normalized query are
+#  reused (RESPONSE_CACHE_SIZE / RESPONSE_CACHE_TTL). Personalized
+#  queries pass use_cache=False and always reach the LLM.
+# ---------------------------------------------------------
+summary_cache = ResponseCache()
+
+
+def summary_cache_key(result: PipelineResult, use_cache: bool = True) -> tuple | None:
+    key = summary_cache.key(result.context, result.prompt_version, result.final_docs, result.member_query) if use_cache else None
+    if key is None:
+        SUMMARY_CACHE.inc(result="bypass")
+    return key
+
+
+def cached_summary(key: tuple | None) -> str | None:
+    if key is None:
+        return None
+    response = summary_cache.get(key)
+    SUMMARY_CACHE.inc(result="miss" if response is None else "hit")
+    return response
+
+
+def summarize_result(result: PipelineResult, use_cache: bool = True) -> None:
+    key = summary_cache_key(result, use_cache)
+    response = cached_summary(key)
+    if response is not None:
+        result.response, result.cached = response, True
+        return
+    result.response = summarize_docs_llm(result.member_query, result.context, result.final_docs, result.prompt_text)
+    if key is not None:
+        summary_cache.put(key, result.response)
+
+
+def _safe(result: PipelineResult, step: str, fn, *args, default=None):
+    try:
+        return fn(*args)
+    except Exception as e:
+        result.errors[step] = str(e)
+        return default
+
+
+# ---------------------------------------------------------
+#  Sequential mode — STEP 1..6 in order, MCP fetches batched
+# ---------------------------------------------------------
+def run_pipeline(
+    member_query: str,
+    verbose: bool = False,
+    timeout: float | None = PIPELINE_DEADLINE_SECONDS,
+    use_cache: bool = True,
+) -> PipelineResult:
+    # Every MCP / LLM call inside sizes its timeout from this deadline
+    with deadline(timeout):
+        return _run_pipeline(member_query, verbose, use_cache)
+
+
+def _run_pipeline(member_query: str, verbose: bool, use_cache: bool) -> PipelineResult:
+    result = PipelineResult(member_query)
+
+    def step(title: str) -> None:
+        if verbose:
+            print("=" * 60)
+            print(title)
+            print("=" * 60)
+
+    def report(name: str, ok_message: str) -> None:
+        if verbose:
+            print(f"❌ {name} failed: {result.errors[name]}" if name in result.errors else f"✅ {ok_message}")
+
+    step("STEP 1: Detecting context from member query (local model, LLM fallback)")
+    result.context = detect_context(member_query)
+    report("context", f"Detected context: '{result.context}'")
+
+    step("STEP 2: Getting prompt, resource and tool docs from MCP (one batch)")
+    # Snapshotted prompt/resource skip the gateway; the rest share one batch
+    template = peek_prompt_template(result.context)
+    resource_docs = peek_resource_docs(result.context)
+    calls = [tool_request()]
+    if template is None:
+        # A placeholder render is only worth it when it can be stored
+        calls.append(prompt_request(PROMPT_QUERY_PLACEHOLDER if prompt_snapshots else member_query, result.context))
+    if resource_docs is None:
+        calls.append(resource_request(result.context))
+    responses = iter(mcp.batch(calls))
+    tool_result = next(responses)
+
+    if template is not None:
+        result.prompt_text, result.prompt_version = render_prompt(template, member_query), fingerprint(template)
     else:
-        result = raw.get("result", {})
-        messages = result.get("messages", [])
-
-        if not messages:
-            print(f"⚠️  0 messages returned. Raw result: {json.dumps(result, indent=2)[:500]}")
-        else:
-            prompt_text = messages[0]["content"]["text"]
-            print(f"✅ Prompt returned {len(messages)} message(s)")
-            print(f"   Prompt text: {prompt_text[:200]}...")
-except Exception as e:
-    print(f"❌ Prompt extraction failed: {e}")
-    print(f"   Raw response: {json.dumps(prompt_result.root, indent=2)[:500]}")
-    messages = []
-
-
-# ==========================================================
-#  STEP 3: Read matching resource
-# ==========================================================
-print("=" * 60)
-print(f"STEP 3: Reading resource for context: {context}")
-print("=" * 60)
-
-resource_result = mcp_call("resources/read", {
-    "uri": f"resource://bcbsnc/{context}"
-})
-
-resource_docs = []
-try:
-    contents = resource_result.root.get("result", {}).get("contents", [])
-    for content in contents:
-        data = json.loads(content.get("text", "{}"))
-        resource_docs = data.get("docs", [])
-    print(f"✅ Resource returned {len(resource_docs)} curated docs")
-except Exception as e:
-    print(f"❌ Resource failed: {e}")
-
-
-# ==========================================================
-#  STEP 4: Call tool for dynamic docs
-# ==========================================================
-print("=" * 60)
-print("STEP 4: Calling tool for dynamic docs")
-print("=" * 60)
-
-tool_result = mcp_call("tools/call", {
-    "name": "employerassestfastapi-local",
-    "arguments": {}
-})
-
-tool_docs = []
-try:
-    content_text = tool_result.root["result"]["content"][0]["text"]
-    all_data = json.loads(content_text)
-    all_docs = all_data[0].get("Docs", [])
-
-    # Filter by context keywords as backup
-    CONTEXT_KEYWORDS = {
-        "sud":        ["substance", "sud", "drug", "alcohol"],
-        "anxiety":    ["anxiety", "stress", "mental health"],
-        "depression": ["depression", "mood", "mental health"],
-        "youth-bh":   ["youth", "ybh", "young", "adolescent"],
-        "general":    []
-    }
-    keywords = CONTEXT_KEYWORDS.get(context, [])
-    tool_docs = [
-        doc for doc in all_docs
-        if not keywords or any(
-            kw in doc.get("name", "").lower() or
-            kw in doc.get("description", "").lower()
-            for kw in keywords
+        text = _safe(result, "prompt", parse_prompt_text, next(responses), default="")
+        if prompt_snapshots is not None and text:
+            try:
+                template = check_prompt_template(text)
+                store_prompt_template(result.context, template)
+                text = render_prompt(template, member_query)
+            except PromptTemplateError as e:
+                print(f"{e}; fetching the prompt per query")
+                text = _safe(result, "prompt", fetch_prompt_text, member_query, result.context, default="")
+        result.prompt_text, result.prompt_version = text, prompt_version(text, member_query)
+    report("prompt", f"Prompt text: {result.prompt_text[:200]}...")
+
+    step(f"STEP 3: Reading resource for context: {result.context}")
+    if resource_docs is None:
+        resource_docs = _safe(result, "resource", parse_resource_docs, next(responses))
+        if resource_docs is not None:
+            store_resource_docs(result.context, resource_docs)
+    result.resource_docs = resource_docs or []
+    report("resource", f"Resource returned {len(result.resource_docs)} curated docs")
+
+    step("STEP 4: Retrieving top tool docs for query + context")
+    all_docs = _safe(result, "tool", parse_tool_docs_or_last, tool_result, default=[])
+    with span(PIPELINE_STEP_SECONDS, step="retrieve"):
+        result.tool_docs = (
+            retrieve_docs(all_docs, member_query, result.context, version=tool_docs_version(all_docs)) if all_docs else []
         )
-    ] or all_docs
-    print(f"✅ Tool returned {len(tool_docs)} filtered docs")
-except Exception as e:
-    print(f"❌ Tool failed: {e}")
-
-
-# ==========================================================
-#  STEP 5: Merge resource + tool docs (deduplicate)
-# ==========================================================
-print("=" * 60)
-print("STEP 5: Merging resource and tool docs")
-print("=" * 60)
-
-existing_names = {doc["name"] for doc in resource_docs}
-additional_docs = [doc for doc in tool_docs if doc["name"] not in existing_names]
-final_docs = resource_docs + additional_docs
-print(f"✅ Final merged docs: {len(final_docs)} ({len(resource_docs)} curated + {len(additional_docs)} additional)")
-
-
-# ==========================================================
-#  STEP 6: LLM summarizes into member-friendly response
-# ==========================================================
-print("=" * 60)
-print("STEP 6: LLM generating member response")
-print("=" * 60)
-
-final_response = summarize_docs_llm(MEMBER_QUERY, context, final_docs, prompt_text)
-print(f"\n{'=' * 60}")
-print("FINAL RESPONSE TO MEMBER:")
-print('=' * 60)
-print(final_response)
-
-
-# ==========================================================
-#  SUMMARY
-# ==========================================================
-print("\n" + "=" * 60)
-print("SUMMARY")
-print("=" * 60)
-print(f"  Member Query    : {MEMBER_QUERY}")
-print(f"  LLM Context     : {context}")
-print(f"  Resource docs   : {len(resource_docs)}")
-print(f"  Tool docs       : {len(tool_docs)}")
-print(f"  Final merged    : {len(final_docs)}")
-print("=" * 60)
\ No newline at end of file
+    report("tool", f"Tool returned {len(result.tool_docs)} top-ranked docs")
+
+    step("STEP 5: Merging resource and tool docs")
+    with span(PIPELINE_STEP_SECONDS, step="merge"):
+        result.final_docs = merge_docs(result.resource_docs, result.tool_docs)
+    additional = len(result.final_docs) - len(result.resource_docs)
+    report("merge", f"Final merged docs: {len(result.final_docs)} ({len(result.resource_docs)} curated + {additional} additional)")
+
+    step("STEP 6: LLM generating member response")
+    summarize_result(result, use_cache)
+    if verbose and result.cached:
+        print("✅ Served from response cache")
+    return result
+
+
+# ---------------------------------------------------------
+#  Async mode — the same steps as a dependency graph
+#
+#      classify ──┬── prompt ──────────────┐
+#                 ├── resource ── merge ── summarize
+#      tool ──────┴── filter ────┘
+#
+#  Every step starts as soon as its inputs are ready, so the tool
+#  fetch overlaps classification and prompt/resource overlap each
+#  other. Latency approaches classify → fetch → summarize.
+#  prepare_pipeline_async() stops before summarize so callers can
+#  stream the summary instead.
+# ---------------------------------------------------------
+async def run_graph(steps: dict[str, tuple[tuple[str, ...], Callable[..., Awaitable[Any]]]]) -> dict[str, Any]:
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run(name: str) -> Any:
+        deps, fn = steps[name]
+        args = [await tasks[dep] for dep in deps]
+        return await fn(*args)
+
+    for name in steps:
+        tasks[name] = asyncio.create_task(run(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return {name: task.result() for name, task in tasks.items()}
+
+
+async def prepare_pipeline_async(member_query: str, timeout: float | None = PIPELINE_DEADLINE_SECONDS) -> PipelineResult:
+    with deadline(timeout):
+        return await _prepare_pipeline_async(member_query)
+
+
+async def _prepare_pipeline_async(member_query: str) -> PipelineResult:
+    result = PipelineResult(member_query)
+
+    async def fetch(step: str, fn, args: tuple, default):
+        try:
+            with span(PIPELINE_STEP_SECONDS, step=step):
+                return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            result.errors[step] = str(e)
+            return default
+
+    async def classify():
+        return await asyncio.to_thread(detect_context, member_query)
+
+    async def tool():
+        return await fetch("tool", fetch_tool_docs, (), [])
+
+    async def prompt(context):
+        text, result.prompt_version = await fetch("prompt", get_prompt, (member_query, context), ("", fingerprint("")))
+        return text
+
+    async def resource(context):
+        return await fetch("resource", get_resource_docs, (context,), [])
+
+    async def filter_step(all_docs, context):
+        with span(PIPELINE_STEP_SECONDS, step="retrieve"):
+            return retrieve_docs(all_docs, member_query, context, version=tool_docs_version(all_docs)) if all_docs else []
+
+    async def merge(resource_docs, tool_docs):
+        with span(PIPELINE_STEP_SECONDS, step="merge"):
+            return merge_docs(resource_docs, tool_docs)
+
+    outputs = await run_graph({
+        "classify":  ((), classify),
+        "tool":      ((), tool),
+        "prompt":    (("classify",), prompt),
+        "resource":  (("classify",), resource),
+        "filter":    (("tool", "classify"), filter_step),
+        "merge":     (("resource", "filter"), merge),
+    })
+
+    result.context = outputs["classify"]
+    result.prompt_text = outputs["prompt"]
+    result.resource_docs = outputs["resource"]
+    result.tool_docs = outputs["filter"]
+    result.final_docs = outputs["merge"]
+    return result
+
+
+async def run_pipeline_async(
+    member_query: str,
+    timeout: float | None = PIPELINE_DEADLINE_SECONDS,
+    use_cache: bool = True,
+) -> PipelineResult:
+    # One deadline for fetch + summarize
+    with deadline(timeout):
+        result = await prepare_pipeline_async(member_query)
+        await asyncio.to_thread(summarize_result, result, use_cache)
+    return result
+
+
+async def answer_member_query(member_query: str, use_cache: bool = True) -> dict:
+    """Run the pipeline for one query; the JSON shape served by POST /member-query."""
+    result = await run_pipeline_async(member_query, use_cache=use_cache)
+    return {
+        "member_query": result.member_query,
+        "context": result.context,
+        "response": result.response,
+        "cached": result.cached,
+        "docs": result.final_docs,
+        "errors": result.errors,
+    }
+
+
+# ---------------------------------------------------------
+#  Service lifecycle — a long-lived worker builds clients and
+#  indexes once (warm_pipeline) and releases them on shutdown
+# ---------------------------------------------------------
+def warm_pipeline(prime_docs: bool = True) -> None:
+    get_claude()
+    if prime_docs:
+        # Capability lists + validators, and a heads-up if our names are gone
+        if capabilities.tool(TOOL_NAME) is None:
+            print(f"Tool {TOOL_NAME!r} not listed by the gateway")
+        if capabilities.prompt(PROMPT_NAME) is None:
+            print(f"Prompt {PROMPT_NAME!r} not listed by the gateway")
+        # First tool fetch + retrieval index build, off the request path
+        all_docs = parse_tool_docs_or_last(mcp.call(*tool_request()))
+        retrieve_docs(all_docs, "", "general", version=tool_docs_version(all_docs))
+
+
+def close_pipeline() -> None:
+    global _claude
+    mcp.close()
+    if _claude is not None:
+        _claude.close()
+        _claude = None
+
+
+# ---------------------------------------------------------
+#  Change this to test different member queries
+# ---------------------------------------------------------
+MEMBER_QUERY = "I've been feeling really down lately and can't find motivation"
+
+
+if __name__ == "__main__":
+    # python mcp_client_prompt_LLM.py [--async]
+    if "--async" in sys.argv[1:]:
+        print(f"Member query: {MEMBER_QUERY} (async pipeline)")
+        pipeline = asyncio.run(run_pipeline_async(MEMBER_QUERY))
+    else:
+        print(f"Member query: {MEMBER_QUERY}")
+        pipeline = run_pipeline(MEMBER_QUERY, verbose=True)
+
+    print(f"\n{'=' * 60}")
+    print("FINAL RESPONSE TO MEMBER:")
+    print('=' * 60)
+    print(pipeline.response)
+
+    # ==========================================================
+    #  SUMMARY
+    # ==========================================================
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"  Member Query    : {pipeline.member_query}")
+    print(f"  Context         : {pipeline.context}")
+    print(f"  Resource docs   : {len(pipeline.resource_docs)}")
+    print(f"  Tool docs       : {len(pipeline.tool_docs)}")
+    print(f"  Final merged    : {len(pipeline.final_docs)}")
+    for step, error in pipeline.errors.items():
+        print(f"  ❌ {step:<14}: {error}")
+    print("=" * 60)
@@ -1,45 +1,17 @@
 import json
-import uuid
-import requests
-from typing import Any
-from pydantic import RootModel
-
-MCP_URL = "http://localhost:4444/mcp/fd477fc295cf488da8c16219e2af894b"
+from doc_index import filter_docs
+from mcp_gateway import MCPClient
+from mcp_models import CatalogToolResult, ResourceResult
+from mcp_registry import CapabilityRegistry
 
 
 # ---------------------------------------------------------
-#  Pydantic passthrough model (accepts ANY JSON)
+#  MCP call wrapper (pooled session, truncated raw dump) and
+#  capability registry (lists + outputSchema validators)
 # ---------------------------------------------------------
-class MCPResponse(RootModel[Any]):
-    pass
-
-
-# ---------------------------------------------------------
-#  MCP call wrapper
-# ---------------------------------------------------------
-def mcp_call(method: str, params: dict | None = None):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": method,
-        "params": params or {}
-    }
-    response = requests.post(
-        MCP_URL,
-        data=json.dumps(payload),
-        headers={"Accept": "application/json", "Content-Type": "application/json"}
-    )
-    print(f"\n--- Raw Response for {method} ---")
-    print("Status:", response.status_code)
-    print("Body:", response.text[:300], "..." if len(response.text) > 300 else "")
-    print("--- End Raw ---\n")
-
-    try:
-        return MCPResponse.model_validate(response.json())
-    except Exception as e:
-        print("Pydantic failed, returning raw JSON")
-        print("Error:", e)
-        return response.json()
+mcp = MCPClient(debug=True, debug_max_chars=300)
+mcp_call = mcp.call
+capabilities = CapabilityRegistry(mcp)
 
 
 # ---------------------------------------------------------
@@ -72,16 +44,19 @@ print("=" * 60)
 print("STEP 1: Calling tool - employerassestfastapi-local")
 print("=" * 60)
 
+# Project server-side to the fields this script prints / filters on
 tool_result = mcp_call("tools/call", {
     "name": "employerassestfastapi-local",
-    "arguments": {}
-})
+    "arguments": {"fields": "name,description,onEnglishAction,onEnglishEmailSave,onEnglishVideoAction"}
+}, CatalogToolResult)
 
 all_docs = []
 try:
-    content_text = tool_result.root["result"]["content"][0]["text"]
-    all_data = json.loads(content_text)
-    all_docs = all_data[0].get("Docs", [])
+    if capabilities.tool("employerassestfastapi-local") is None:
+        print("⚠️  Tool not in tools/list — the call may fail")
+    result = tool_result.unwrap()
+    all_docs = result.docs()
+    capabilities.validate_tool_output("employerassestfastapi-local", result.payload())
     print(f"✅ Tool returned {len(all_docs)} total documents")
 except Exception as e:
     print(f"❌ Tool call failed: {e}")
@@ -128,16 +103,16 @@ print("=" * 60)
 
 resource_result = mcp_call("resources/read", {
     "uri": f"resource://bcbsnc/{context}"
-})
+}, ResourceResult)
 
 resource_docs = []
 try:
-    contents = resource_result.root.get("result", {}).get("contents", [])
+    contents = resource_result.unwrap().contents
     print(f"✅ Resource returned {len(contents)} content block(s)")
     for content in contents:
-        data = json.loads(content.get("text", "{}"))
-        resource_docs = data.get("docs", [])
-        print(f"\n  Context : {data.get('context')}")
+        data = content.text
+        resource_docs = data.docs
+        print(f"\n  Context : {data.context}")
         print(f"  Docs    : {len(resource_docs)} relevant documents")
         for doc in resource_docs:
             link = (
@@ -150,7 +125,7 @@ try:
             print(f"      {link}")
 except Exception as e:
     print(f"❌ Resource read failed: {e}")
-    print(json.dumps(resource_result.root, indent=2))
+    print(resource_result.model_dump_json(indent=2))
 
 
 # ==========================================================
@@ -160,23 +135,7 @@ print("=" * 60)
 print(f"STEP 4: Filtering tool docs by context '{context}'")
 print("=" * 60)
 
-CONTEXT_KEYWORDS = {
-    "sud":        ["substance", "sud", "drug", "alcohol"],
-    "anxiety":    ["anxiety", "stress", "mental health"],
-    "depression": ["depression", "mood", "mental health"],
-    "youth-bh":   ["youth", "ybh", "young", "adolescent"],
-    "general":    []
-}
-
-keywords = CONTEXT_KEYWORDS.get(context, [])
-filtered_docs = [
-    doc for doc in all_docs
-    if not keywords or any(
-        kw in doc.get("name", "").lower() or
-        kw in doc.get("description", "").lower()
-        for kw in keywords
-    )
-] or all_docs  # fallback to all if nothing matched
+filtered_docs = filter_docs(all_docs, context)  # falls back to all if nothing matched
 
 print(f"✅ Filtered {len(filtered_docs)} docs from tool response:")
 for doc in filtered_docs:
@@ -1,81 +1,35 @@
 import json
-import uuid
-import requests
-from typing import Any
-from pydantic import RootModel
-
-MCP_URL = "http://localhost:4444/mcp/fd477fc295cf488da8c16219e2af894b"
-
-
-# ---------------------------------------------------------
-#  Pydantic passthrough model (accepts ANY JSON)
-# ---------------------------------------------------------
-class MCPResponse(RootModel[Any]):
-    pass
+from mcp_gateway import MCPClient
+from mcp_registry import CapabilityRegistry
 
 
 # ---------------------------------------------------------
-#  MCP call wrapper
+#  MCP call wrapper (pooled session, raw body dumped) and
+#  capability registry (lists + outputSchema validators)
 # ---------------------------------------------------------
-def mcp_call(method: str, params: dict | None = None):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": method,
-        "params": params or {}
-    }
-
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(
-        MCP_URL,
-        data=json.dumps(payload),
-        headers=headers
-    )
-
-    print("\n--- Raw Response for", method, "---")
-    print("Status:", response.status_code)
-    print("Body:", response.text)
-    print("--- End Raw ---\n")
-
-    # Parse with permissive RootModel
-    try:
-        parsed = MCPResponse.model_validate(response.json())
-    except Exception as e:
-        print("Pydantic failed, returning raw JSON instead")
-        print("Error:", e)
-        return response.json()
-
-    return parsed
+mcp = MCPClient(debug=True)
+mcp_call = mcp.call
+capabilities = CapabilityRegistry(mcp)
 
 
 # ---------------------------------------------------------
-#  Step 1: List all tools and inspect stored schema
+#  Step 1: Discover tools / prompts / resources (one batch)
 # ---------------------------------------------------------
 print("=" * 60)
-print("STEP 1: Checking tools/list to inspect stored outputSchema")
+print("STEP 1: Discovering tools, prompts and resources")
 print("=" * 60)
 
-tools_result = mcp_call("tools/list", {})
-print("\n--- Tools List (Full) ---")
-print(json.dumps(tools_result.root, indent=2))
-print("--- End Tools List ---\n")
-
-# Extract and print just the relevant tool's schema
-try:
-    tools = tools_result.root.get("result", {}).get("tools", [])
-    print(f"Total tools found: {len(tools)}\n")
-    for tool in tools:
-        print(f"Tool: {tool.get('name')}")
-        print(f"  Description: {tool.get('description', 'N/A')}")
-        print(f"  Input Schema:  {json.dumps(tool.get('inputSchema', {}), indent=4)}")
-        print(f"  Output Schema: {json.dumps(tool.get('outputSchema', 'NOT DEFINED'), indent=4)}")
-        print()
-except Exception as e:
-    print(f"Could not parse tools list: {e}")
+tools = capabilities.tools()
+print(f"Total tools found: {len(tools)}\n")
+for tool in tools.values():
+    validator = capabilities.validator(tool.name)
+    print(f"Tool: {tool.name}")
+    print(f"  Description: {tool.description or 'N/A'}")
+    print(f"  Input params:  {', '.join(tool.inputSchema.get('properties', {})) or 'none'}")
+    print(f"  Output Schema: {type(validator).__name__ if validator else 'NOT DEFINED'}")
+    print()
+print(f"Prompts:   {', '.join(capabilities.prompts()) or 'none'}")
+print(f"Resources: {', '.join(capabilities.resources()) or 'none'}\n")
 
 
 # ---------------------------------------------------------
@@ -106,6 +60,7 @@ print("=" * 60)
 
 is_error = tool_result.get("isError", True)
 content = tool_result.get("content", [])
+validate = not is_error and capabilities.validator("employerassestfastapi-local") is not None
 
 if is_error:
     print("❌ Tool call failed!")
@@ -113,21 +68,29 @@ if is_error:
         print(f"   Error: {item.get('text', 'Unknown error')}")
 else:
     print("✅ Tool call succeeded!")
-    for item in content:
+    for index, item in enumerate(content):
         text = item.get("text", "")
         # Try to parse as JSON if it looks like JSON
         try:
             data = json.loads(text)
-            print(f"\nParsed {len(data)} category/categories:\n")
-            for category in data:
-                print(f"  Title:   {category.get('title')}")
-                print(f"  Summary: {category.get('summary', '')[:80]}...")
-                docs = category.get("Docs", [])
-                print(f"  Docs:    {len(docs)} documents")
-                for doc in docs:
-                    print(f"    - {doc.get('name')}")
-                print()
         except json.JSONDecodeError:
             print("Response is plain text (not JSON):")
             print(text)
-            
\ No newline at end of file
+            continue
+        print(f"\nParsed {len(data)} category/categories:\n")
+        for category in data:
+            print(f"  Title:   {category.get('title')}")
+            print(f"  Summary: {category.get('summary', '')[:80]}...")
+            docs = category.get("Docs", [])
+            print(f"  Docs:    {len(docs)} documents")
+            for doc in docs:
+                print(f"    - {doc.get('name')}")
+            print()
+        if validate and index == 0:
+            # Same decoded text as printed above — no second json.loads
+            try:
+                # Precompiled at discovery — no schema re-read per result
+                capabilities.validate_tool_output("employerassestfastapi-local", data)
+                print("✅ Output matches outputSchema")
+            except Exception as e:
+                print(f"⚠️  {e}")
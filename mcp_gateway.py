@@ -0,0 +1,240 @@
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable
+
+import requests
+from pydantic import BaseModel, RootModel, ValidationError
+from requests.adapters import HTTPAdapter
+
+from mcp_models import RPCResponse
+from metrics import MCP_CALL_SECONDS, span
+from resilience import CircuitBreaker, DeadlineExceeded, LatencyWindow, hedged, time_left
+
+MCP_URL = os.getenv("MCP_URL", "http://localhost:4444/mcp/fd477fc295cf488da8c16219e2af894b")
+
+# ---------------------------------------------------------
+#  Gateway tuning — override via environment
+# ---------------------------------------------------------
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "3.05"))
+MCP_READ_TIMEOUT = float(os.getenv("MCP_READ_TIMEOUT", "30"))
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "10"))
+MCP_DEBUG = os.getenv("MCP_DEBUG", "").lower() in ("1", "true", "yes")
+# Idempotent reads that may be sent twice (hedged) when slow
+MCP_HEDGED_METHODS = frozenset(
+    m.strip() for m in os.getenv("MCP_HEDGED_METHODS", "resources/read,prompts/get,tools/list").split(",") if m.strip()
+)
+
+
+# A single -32600 error or one of these statuses answering a batch
+# means the gateway doesn't take arrays
+INVALID_REQUEST = -32600
+BATCH_UNSUPPORTED_STATUSES = frozenset({400, 501})
+
+
+# ---------------------------------------------------------
+#  Pydantic passthrough model (accepts ANY JSON) — used when a
+#  call names no result type; typed calls get RPCResponse[result]
+# ---------------------------------------------------------
+class MCPResponse(RootModel[Any]):
+    pass
+
+
+def response_model(result: type | None) -> type[BaseModel]:
+    return MCPResponse if result is None else RPCResponse[result]
+
+
+def _error_envelope(request_id: str | None, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": -32603, "message": message}
+    }
+
+
+def _decode_item(result: type | None, item: dict) -> BaseModel:
+    # One malformed batch item becomes an error, not a failed batch
+    model = response_model(result)
+    try:
+        return model.model_validate(item)
+    except ValidationError as e:
+        return model.model_validate(_error_envelope(item.get("id"), f"Invalid response: {e}"))
+
+
+# ---------------------------------------------------------
+#  MCP JSON-RPC client
+#
+#  One pooled keep-alive requests.Session per client, so back-to-back
+#  gateway calls reuse the same TCP/TLS connection.
+#
+#  Every POST is bounded by the active deadline (resilience.deadline)
+#  and goes through one circuit breaker per client. Hedged methods get
+#  a duplicate request once they run past their recent p95.
+# ---------------------------------------------------------
+class MCPClient:
+    def __init__(
+        self,
+        url: str = MCP_URL,
+        connect_timeout: float = MCP_CONNECT_TIMEOUT,
+        read_timeout: float = MCP_READ_TIMEOUT,
+        pool_size: int = MCP_POOL_SIZE,
+        debug: bool = MCP_DEBUG,
+        debug_max_chars: int | None = None,
+        hedge: bool = True,
+    ):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.debug = debug
+        self.debug_max_chars = debug_max_chars
+        self.supports_batch = True
+        self.hedge = hedge
+        self.breaker = CircuitBreaker("mcp_gateway")
+        self.latency = LatencyWindow()
+        # Called with every server notification seen (e.g. */list_changed)
+        self.listeners: list[Callable[[dict], Any]] = []
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call(self, method: str, params: dict | None = None, result: type | None = None) -> BaseModel:
+        # Decoded straight from the raw bytes in one validation pass
+        model = response_model(result)
+        body = json.dumps(self._payload(method, params))
+        with span(MCP_CALL_SECONDS, method=method):
+            if self.hedge and method in MCP_HEDGED_METHODS:
+                response = hedged(lambda: self._post(method, body), self.latency.hedge_delay(method), method)
+            else:
+                response = self._post(method, body)
+            if self.debug:
+                self._dump(method, response)
+            return model.model_validate_json(response.content)
+
+    def _post(self, method: str, body: str, unsupported: frozenset[int] = frozenset()) -> requests.Response:
+        # Raises DeadlineExceeded / CircuitOpenError before touching the network
+        timeout = (time_left(self.connect_timeout), time_left(self.read_timeout))
+        self.breaker.check()
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=body, timeout=timeout)
+        except requests.Timeout as e:
+            if timeout != (self.connect_timeout, self.read_timeout):
+                # Our deadline cut the timeout short — not the gateway's fault
+                self.breaker.release()
+                raise DeadlineExceeded("deadline exceeded") from e
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code in unsupported:
+            # The gateway answered — it just can't do this kind of request
+            self.breaker.record_success()
+        elif response.status_code >= 500:
+            self.breaker.record_failure()
+            response.raise_for_status()
+        else:
+            self.breaker.record_success()
+            self.latency.observe(method, time.perf_counter() - started)
+        return response
+
+    # -----------------------------------------------------
+    #  JSON-RPC 2.0 batch
+    #
+    #  Sends every call as one array in a single POST and matches the
+    #  responses back by id. Results come back in the order of `calls`;
+    #  a failed item carries a JSON-RPC "error" object instead of
+    #  "result", so one bad call never fails the whole batch. Gateways
+    #  that reject arrays are remembered and served by individual calls.
+    #  Each call is (method, params) or (method, params, result type).
+    # -----------------------------------------------------
+    def batch(self, calls: list[tuple]) -> list[BaseModel]:
+        calls = [(call + (None,))[:3] for call in calls]
+        payloads = [self._payload(method, params) for method, params, _ in calls]
+        if self.supports_batch and len(payloads) > 1:
+            try:
+                responses = self._post_batch(payloads)
+            except Exception as e:
+                # Gateway down / circuit open / deadline: every item fails, fast
+                return [response_model(result).model_validate(_error_envelope(p["id"], str(e)))
+                        for p, (_, _, result) in zip(payloads, calls)]
+            if responses is not None:
+                return [
+                    _decode_item(result, responses.get(p["id"]) or _error_envelope(p["id"], "No response for batch item"))
+                    for p, (_, _, result) in zip(payloads, calls)
+                ]
+            self.supports_batch = False
+
+        results = []
+        for method, params, result in calls:
+            try:
+                results.append(self.call(method, params, result))
+            except Exception as e:
+                results.append(response_model(result).model_validate(_error_envelope(None, str(e))))
+        return results
+
+    def _post_batch(self, payloads: list[dict]) -> dict[str, Any] | None:
+        # 501 Not Implemented is a rejection, not an outage — no breaker failure
+        with span(MCP_CALL_SECONDS, method="batch"):
+            response = self._post("batch", json.dumps(payloads), BATCH_UNSUPPORTED_STATUSES)
+        if self.debug:
+            self._dump("batch[" + ", ".join(p["method"] for p in payloads) + "]", response)
+        # Only an explicit rejection means no batch support; anything else
+        # (401, 429, a truncated body...) fails this batch's items only
+        if response.status_code in BATCH_UNSUPPORTED_STATUSES:
+            return None
+        response.raise_for_status()
+        body = response.json()
+        if isinstance(body, dict) and (body.get("error") or {}).get("code") == INVALID_REQUEST:
+            return None
+        if not isinstance(body, list):
+            raise ValueError(f"Unexpected batch response: {str(body)[:200]}")
+        for item in body:
+            if isinstance(item, dict) and "method" in item and "id" not in item:
+                self.notify(item)
+        return {item.get("id"): item for item in body if isinstance(item, dict)}
+
+    def notify(self, message: dict) -> None:
+        for listener in self.listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                print(f"Notification listener failed: {e!r}")
+
+    @staticmethod
+    def _payload(method: str, params: dict | None) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": str(uuid.uuid4()),
+            "method": method,
+            "params": params or {}
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "MCPClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -----------------------------------------------------
+    #  Raw-body debug dump
+    # -----------------------------------------------------
+    def _dump(self, method: str, response: requests.Response) -> None:
+        body = response.text
+        truncated = self.debug_max_chars is not None and len(body) > self.debug_max_chars
+        if truncated:
+            body = body[:self.debug_max_chars]
+        print(f"\n--- Raw Response for {method} ---")
+        print("Status:", response.status_code)
+        print("Body:", body, "..." if truncated else "")
+        print("--- End Raw ---\n")
@@ -0,0 +1,197 @@
+import hashlib
+from typing import Annotated, Any, Generic, NotRequired, TypedDict, TypeVar
+
+from pydantic import BaseModel, ConfigDict, Field, Json, TypeAdapter, ValidationError, model_validator
+
+# ---------------------------------------------------------
+#  Catalog docs — TypedDicts, so validated docs stay plain dicts
+#  for the index / retrieval / snapshot code. Unknown keys kept.
+# ---------------------------------------------------------
+class Doc(TypedDict):
+    __pydantic_config__ = ConfigDict(extra="allow")  # type: ignore[misc]
+
+    name: NotRequired[str | None]
+    description: NotRequired[str | None]
+    onEnglishAction: NotRequired[str | None]
+    onEnglishEmailSave: NotRequired[str | None]
+    onEnglishVideoAction: NotRequired[str | None]
+
+
+class Category(TypedDict):
+    __pydantic_config__ = ConfigDict(extra="allow")  # type: ignore[misc]
+
+    title: NotRequired[str | None]
+    summary: NotRequired[str | None]
+    Docs: NotRequired[list[Doc]]
+
+
+# ---------------------------------------------------------
+#  MCP results
+#
+#  Embedded JSON text is typed as Json[...], so the envelope and
+#  the payload inside it are decoded in the same validation pass.
+# ---------------------------------------------------------
+class TextContent(BaseModel):
+    type: str = "text"
+    text: str
+
+
+ERROR_MAX_CHARS = 300
+_CATALOG_TEXT = TypeAdapter(Json[list[Category]])
+
+
+def truncate(text: str, limit: int = ERROR_MAX_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class CatalogContent(BaseModel):
+    type: str = "text"
+    # Tool errors come back as plain text, so fall back to str
+    text: Annotated[Json[list[Category]] | str, Field(union_mode="left_to_right")]
+    # Hash of the raw text, taken before it is decoded
+    digest: str | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _digest_text(cls, data: Any) -> Any:
+        if isinstance(data, dict) and isinstance(data.get("text"), str):
+            data = {**data, "digest": hashlib.blake2b(data["text"].encode(), digest_size=16).hexdigest()}
+        return data
+
+
+class CatalogToolResult(BaseModel):
+    content: list[CatalogContent] = []
+    isError: bool = False
+    structuredContent: Any = None
+    meta: dict[str, Any] | None = Field(None, alias="_meta")
+
+    def catalog_hash(self) -> str | None:
+        # /behavior-health's X-Catalog-Hash, when the gateway relays it. Unlike
+        # X-Catalog-Version (numbered per process) it matches across workers
+        content_hash = (self.meta or {}).get("catalogHash")
+        return None if content_hash is None else str(content_hash)
+
+    def content_key(self) -> str | None:
+        # Same key → same payload; lets per-payload work (validation) be done once
+        if self.catalog_hash() is not None:
+            return f"catalog:{self.catalog_hash()}"
+        return self.content[0].digest if self.content else None
+
+    def payload(self) -> Any:
+        # What outputSchema describes: structuredContent, else the decoded text
+        if self.structuredContent is not None:
+            return self.structuredContent
+        return self.content[0].text if self.content else None
+
+    def docs(self) -> list[Doc]:
+        if not self.content:
+            raise RuntimeError("Tool returned no content")
+        text = self.content[0].text
+        if self.isError:
+            raise RuntimeError(f"Tool error: {truncate(text)}")
+        if isinstance(text, str):
+            # Not a catalog — report why, not the (possibly huge) text itself
+            try:
+                _CATALOG_TEXT.validate_python(text)
+            except ValidationError as e:
+                raise RuntimeError(f"Invalid catalog in tool result: {truncate(str(e))}") from None
+        return text[0].get("Docs", []) if text else []
+
+
+class ResourceData(BaseModel):
+    context: str | None = None
+    docs: list[Doc] = []
+
+
+class ResourceContent(BaseModel):
+    uri: str | None = None
+    mimeType: str | None = None
+    text: Json[ResourceData] = Field(default_factory=ResourceData)
+
+
+class ResourceResult(BaseModel):
+    contents: list[ResourceContent] = []
+
+
+class PromptMessage(BaseModel):
+    role: str
+    content: TextContent
+
+
+class PromptResult(BaseModel):
+    messages: list[PromptMessage] = []
+
+
+# ---------------------------------------------------------
+#  Capability lists (tools/list, prompts/list, resources/list).
+#  Unknown keys kept; nextCursor set when there are more pages.
+# ---------------------------------------------------------
+class ToolInfo(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: str
+    description: str | None = None
+    inputSchema: dict[str, Any] = {}
+    outputSchema: dict[str, Any] | None = None
+
+
+class PromptArgument(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: str
+    description: str | None = None
+    required: bool = False
+
+
+class PromptInfo(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: str
+    description: str | None = None
+    arguments: list[PromptArgument] = []
+
+
+class ResourceInfo(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    uri: str
+    name: str | None = None
+    description: str | None = None
+    mimeType: str | None = None
+
+
+class ToolsListResult(BaseModel):
+    tools: list[ToolInfo] = []
+    nextCursor: str | None = None
+
+
+class PromptsListResult(BaseModel):
+    prompts: list[PromptInfo] = []
+    nextCursor: str | None = None
+
+
+class ResourcesListResult(BaseModel):
+    resources: list[ResourceInfo] = []
+    nextCursor: str | None = None
+
+
+# ---------------------------------------------------------
+#  JSON-RPC 2.0 envelope
+# ---------------------------------------------------------
+class RPCError(BaseModel):
+    code: int
+    message: str
+    data: Any = None
+
+
+ResultT = TypeVar("ResultT")
+
+
+class RPCResponse(BaseModel, Generic[ResultT]):
+    jsonrpc: str = "2.0"
+    id: str | int | None = None
+    result: ResultT | None = None
+    error: RPCError | None = None
+
+    def unwrap(self) -> ResultT:
+        if self.error is not None:
+            raise RuntimeError(f"MCP error: {self.error.model_dump()}")
+        if self.result is None:
+            raise RuntimeError("MCP response has no result")
+        return self.result
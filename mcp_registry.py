@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from typing import Any
+
+from mcp_gateway import MCPClient
+from mcp_models import PromptInfo, PromptsListResult, ResourceInfo, ResourcesListResult, ToolInfo, ToolsListResult
+
+# Optional — tool results go unvalidated when missing
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+# ---------------------------------------------------------
+#  Registry tuning — override via environment
+# ---------------------------------------------------------
+CAPABILITY_TTL_SECONDS = float(os.getenv("CAPABILITY_TTL_SECONDS", "600"))
+CAPABILITY_RETRY_SECONDS = float(os.getenv("CAPABILITY_RETRY_SECONDS", "30"))  # after a failed list
+VALIDATE_TOOL_OUTPUT = os.getenv("VALIDATE_TOOL_OUTPUT", "1").lower() not in ("0", "false", "no")
+
+# kind → (list method, result type, items field, key field)
+LISTS = {
+    "tools": ("tools/list", ToolsListResult, "tools", "name"),
+    "prompts": ("prompts/list", PromptsListResult, "prompts", "name"),
+    "resources": ("resources/list", ResourcesListResult, "resources", "uri"),
+}
+LIST_CHANGED = {f"notifications/{kind}/list_changed": kind for kind in LISTS}
+
+
+class ToolOutputError(RuntimeError):
+    pass
+
+
+def compile_validator(schema: dict[str, Any]) -> Any:
+    # Pick the validator class for the schema's $schema once; reused per result
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+# ---------------------------------------------------------
+#  Capability registry
+#
+#  tools/list, prompts/list and resources/list are fetched together
+#  (one batch, then any further pages) and kept for `ttl` seconds;
+#  a */list_changed notification drops that list at once. Each
+#  tool's outputSchema is compiled into a validator when the tool
+#  list arrives, so validating a result never re-reads the schema,
+#  and a payload already validated under the same key (catalog
+#  version / text hash) is not walked again. A failed refresh keeps
+#  serving the lists we already have and is retried after
+#  CAPABILITY_RETRY_SECONDS.
+# ---------------------------------------------------------
+class CapabilityRegistry:
+    def __init__(self, client: MCPClient, ttl: float = CAPABILITY_TTL_SECONDS, validate: bool = VALIDATE_TOOL_OUTPUT):
+        self.client = client
+        self.ttl = ttl
+        self.validate = validate and jsonschema is not None
+        self._lists: dict[str, dict[str, Any]] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._validators: dict[str, Any] = {}
+        self._validated: dict[str, str] = {}  # tool → key of the last payload that passed
+        self._changed: set[str] = set()  # list_changed seen while a refresh was in flight
+        self._lock = threading.Lock()
+        client.listeners.append(self.handle_notification)
+
+    # -----------------------------------------------------
+    #  Lookups
+    # -----------------------------------------------------
+    def tools(self) -> dict[str, ToolInfo]:
+        return self._get("tools")
+
+    def prompts(self) -> dict[str, PromptInfo]:
+        return self._get("prompts")
+
+    def resources(self) -> dict[str, ResourceInfo]:
+        return self._get("resources")
+
+    def tool(self, name: str) -> ToolInfo | None:
+        return self.tools().get(name)
+
+    def prompt(self, name: str) -> PromptInfo | None:
+        return self.prompts().get(name)
+
+    def validator(self, tool: str) -> Any:
+        self.tools()  # refresh if expired
+        return self._validators.get(tool)
+
+    def validate_tool_output(self, tool: str, payload: Any, key: str | None = None) -> None:
+        if not self.validate:
+            return
+        validator = self.validator(tool)
+        if validator is None or (key is not None and self._validated.get(tool) == key):
+            return
+        error = jsonschema.exceptions.best_match(validator.iter_errors(payload))
+        if error is not None:
+            path = "/".join(str(p) for p in error.absolute_path) or "(root)"
+            raise ToolOutputError(f"{tool} output does not match outputSchema at {path}: {error.message}")
+        if key is not None:
+            self._validated[tool] = key
+
+    # -----------------------------------------------------
+    #  Invalidation
+    # -----------------------------------------------------
+    def invalidate(self, kind: str | None = None) -> None:
+        # No lock: listeners can fire from inside refresh()'s own batch.
+        # _changed makes that refresh expire the list again once stored.
+        for name in [kind] if kind else list(LISTS):
+            self._changed.add(name)
+            self._fetched_at.pop(name, None)
+
+    def handle_notification(self, message: dict) -> bool:
+        kind = LIST_CHANGED.get(message.get("method"))
+        if kind is None:
+            return False
+        self.invalidate(kind)
+        return True
+
+    # -----------------------------------------------------
+    #  Refresh
+    # -----------------------------------------------------
+    def _get(self, kind: str) -> dict[str, Any]:
+        if self._expired(kind):
+            self.refresh([kind] if kind in self._lists else None)
+        return self._lists.get(kind, {})
+
+    def refresh(self, kinds: list[str] | None = None) -> None:
+        # First load fetches every list, so one batch fills the registry
+        kinds = kinds or [kind for kind in LISTS if self._expired(kind)] or list(LISTS)
+        with self._lock:
+            kinds = [kind for kind in kinds if self._expired(kind)]
+            if not kinds:
+                return
+            self._changed.difference_update(kinds)
+            calls = [(LISTS[kind][0], {}, LISTS[kind][1]) for kind in kinds]
+            for kind, response in zip(kinds, self.client.batch(calls)):
+                try:
+                    items = self._collect(kind, response.unwrap())
+                except Exception as e:
+                    print(f"Capability refresh failed for {kind}: {e}")
+                    # Keep what we have; don't re-ask on every lookup
+                    self._fetched_at[kind] = time.monotonic() - self.ttl + min(self.ttl, CAPABILITY_RETRY_SECONDS)
+                    continue
+                if kind == "tools":
+                    self._validators = self._compile(items)
+                    self._validated = {}
+                self._lists[kind] = items
+                self._fetched_at[kind] = time.monotonic()
+            # Notifications that rode in on this batch may postdate what it returned
+            for kind in self._changed.intersection(kinds):
+                self._fetched_at.pop(kind, None)
+
+    def _expired(self, kind: str) -> bool:
+        fetched_at = self._fetched_at.get(kind)
+        return fetched_at is None or time.monotonic() - fetched_at >= self.ttl
+
+    def _collect(self, kind: str, page: Any) -> dict[str, Any]:
+        method, result_type, field, key = LISTS[kind]
+        items = list(getattr(page, field))
+        while page.nextCursor:
+            page = self.client.call(method, {"cursor": page.nextCursor}, result_type).unwrap()
+            items += getattr(page, field)
+        return {getattr(item, key): item for item in items}
+
+    def _compile(self, tools: dict[str, ToolInfo]) -> dict[str, Any]:
+        if not self.validate:
+            return {}
+        validators = {}
+        for name, tool in tools.items():
+            if not tool.outputSchema:
+                continue
+            try:
+                validators[name] = compile_validator(tool.outputSchema)
+            except Exception as e:
+                print(f"Skipping invalid outputSchema for {name}: {e}")
+        return validators
@@ -0,0 +1,206 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+from metrics import CIRCUIT_TRANSITIONS, HEDGED_REQUESTS
+
+# ---------------------------------------------------------
+#  Resilience tuning — override via environment
+# ---------------------------------------------------------
+PIPELINE_DEADLINE_SECONDS = float(os.getenv("PIPELINE_DEADLINE_SECONDS", "25"))
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "0.5"))  # until enough samples
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Room for a primary and its hedge per pooled gateway connection
+HEDGE_POOL_SIZE = int(os.getenv("HEDGE_POOL_SIZE", str(2 * int(os.getenv("MCP_POOL_SIZE", "10")))))
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+# ---------------------------------------------------------
+#  Deadlines
+#
+#  An absolute monotonic deadline in a ContextVar, so it follows the
+#  request into asyncio tasks and asyncio.to_thread workers. Nested
+#  deadlines only ever tighten. Calls size their timeouts with
+#  time_left() instead of a fixed per-call value.
+# ---------------------------------------------------------
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def time_left(timeout: float) -> float:
+    """`timeout`, cut down to what is left of the active deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+    return min(timeout, left)
+
+
+# ---------------------------------------------------------
+#  Recent latencies per key — drives the hedge delay
+# ---------------------------------------------------------
+class LatencyWindow:
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.size)).append(seconds)
+
+    def quantile(self, key: str, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self, key: str) -> float:
+        observed = self.quantile(key, HEDGE_QUANTILE)
+        return HEDGE_DEFAULT_DELAY if observed is None else max(HEDGE_MIN_DELAY, observed)
+
+
+# ---------------------------------------------------------
+#  Hedged call
+#
+#  Runs `fn`; if it has not finished `delay` after it started, starts
+#  a second copy and returns whichever succeeds first. Only for
+#  idempotent requests — the slower copy is left to finish in the
+#  background. Time spent queued for a pool thread doesn't count
+#  toward the delay, so a busy pool doesn't trigger hedges.
+# ---------------------------------------------------------
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+
+
+def hedged(fn: Callable[[], T], delay: float, label: str = "") -> T:
+    def submit(started: threading.Event | None = None) -> Future:
+        # Carry the caller's deadline into the worker thread
+        context = contextvars.copy_context()
+
+        def run() -> T:
+            if started is not None:
+                started.set()
+            return context.run(fn)
+
+        return _hedge_pool.submit(run)
+
+    started = threading.Event()
+    primary = submit(started)
+    if not started.wait(remaining()):
+        primary.cancel()
+        raise DeadlineExceeded("deadline exceeded")
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    HEDGED_REQUESTS.inc(method=label)
+    futures = {primary, submit()}
+    error: BaseException | None = None
+    while futures:
+        done, futures = wait(futures, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded("deadline exceeded")
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+# ---------------------------------------------------------
+#  Circuit breaker
+#
+#  closed → open after `failures` consecutive failures; open fails
+#  fast for `reset_after` seconds, then half-open lets one trial
+#  call through — success closes, failure re-opens.
+# ---------------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+                self._transition("half-open")
+            if self.state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == "open":
+                # A straggler sent before the breaker opened; only the half-open trial may close it
+                return
+            self._consecutive = 0
+            self._trial = False
+            if self.state != "closed":
+                self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._trial = False
+            if self.state == "half-open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+    def release(self) -> None:
+        # The allowed call ended without a verdict (e.g. the caller's own deadline)
+        with self._lock:
+            self._trial = False
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
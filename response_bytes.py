@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi import Request, Response
+
+# Optional accelerators — plain json / gzip-only when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ---------------------------------------------------------
+#  Encoding tuning — override via environment
+# ---------------------------------------------------------
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+ENCODED_VARIANTS_MAX = int(os.getenv("ENCODED_VARIANTS_MAX", "64"))
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def etag_matches(header: str | None, *etags: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return not candidates.isdisjoint(etags)
+
+
+# ---------------------------------------------------------
+#  One JSON body, serialized once, with precomputed gzip/brotli
+#  variants. `etag` is a strong ETag over the identity bytes; each
+#  content-coding gets its own ("<hash>-gzip", "<hash>-br"), and
+#  If-None-Match with any of them is a match.
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class EncodedBody:
+    identity: bytes | memoryview
+    etag: str
+    gzip: bytes | memoryview | None = None
+    br: bytes | memoryview | None = None
+
+    @classmethod
+    def encode(cls, obj: Any) -> "EncodedBody":
+        body = dumps(obj)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        if len(body) < COMPRESS_MIN_BYTES:
+            return cls(body, etag)
+        return cls(
+            identity=body,
+            etag=etag,
+            gzip=gzip.compress(body, compresslevel=9, mtime=0),
+            br=brotli.compress(body, quality=9) if brotli is not None else None,
+        )
+
+    def coding_etag(self, coding: str) -> str:
+        return self.etag if coding == "identity" else f'{self.etag[:-1]}-{coding}"'
+
+    def response(self, request: Request, headers: dict[str, str] | None = None) -> Response:
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        coding, content = "identity", self.identity
+        if self.br is not None and "br" in accepted:
+            coding, content = "br", self.br
+        elif self.gzip is not None and ("gzip" in accepted or "*" in accepted):
+            coding, content = "gzip", self.gzip
+
+        headers = {**(headers or {}), "ETag": self.coding_etag(coding), "Vary": "Accept-Encoding"}
+        etags = [self.coding_etag(c) for c in ("identity", "gzip", "br")]
+        if etag_matches(request.headers.get("if-none-match"), *etags):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        # bytes() is a no-op for bytes; copies memoryviews of a mapped snapshot
+        return Response(content=bytes(content), media_type="application/json", headers=headers)
+
+
+# ---------------------------------------------------------
+#  Encoded bodies for the current source object (one catalog
+#  version). Variants are keyed by request params, LRU-bounded,
+#  and dropped wholesale when the source object changes.
+# ---------------------------------------------------------
+class EncodedCache:
+    def __init__(self, maxsize: int = ENCODED_VARIANTS_MAX):
+        self.maxsize = maxsize
+        self._source: Any = None
+        self._entries: OrderedDict[Any, EncodedBody] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, source: Any, key: Any) -> EncodedBody | None:
+        with self._lock:
+            if source is not self._source:
+                return None
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def get(self, source: Any, key: Any, build: Callable[[], Any]) -> EncodedBody:
+        body = self.peek(source, key)
+        if body is not None:
+            return body
+        body = EncodedBody.encode(build())
+        with self._lock:
+            if source is not self._source:
+                self._source = source
+                self._entries.clear()
+            self._entries[key] = body
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body
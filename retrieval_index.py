@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from caching import normalize_query
+from doc_index import CONTEXT_KEYWORDS, docs_fingerprint, filter_docs
+
+# ---------------------------------------------------------
+#  Retrieval tuning — override via environment
+# ---------------------------------------------------------
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+CONTEXT_TERM_WEIGHT = float(os.getenv("CONTEXT_TERM_WEIGHT", "0.5"))
+
+
+def tokenize(text: str) -> list[str]:
+    return normalize_query(text).split()
+
+
+# ---------------------------------------------------------
+#  Immutable TF-IDF snapshot, stored term-major (inverted):
+#  postings of term t are doc_ids/weights[term_ptr[t]:term_ptr[t+1]].
+#  Doc vectors are L2-normalised, so a dot product is cosine.
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class _Snapshot:
+    version: str
+    docs: list
+    vocab: dict[str, int]
+    idf: np.ndarray
+    term_ptr: np.ndarray
+    doc_ids: np.ndarray
+    weights: np.ndarray
+
+
+class RetrievalIndex:
+    def __init__(self):
+        self._vocab: dict[str, int] = {}
+        # (name, description) → (term ids, term counts); reused across rebuilds
+        self._doc_terms: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+        self._snapshot: _Snapshot | None = None
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------
+    #  Build / incremental rebuild
+    #
+    #  Only docs whose name/description were not seen before are
+    #  tokenized; IDF, norms and postings are recomputed with NumPy.
+    # -----------------------------------------------------
+    def update(self, docs: list, version: str | None = None) -> None:
+        snapshot = self._snapshot
+        if snapshot is not None and docs is snapshot.docs:
+            return
+        version = version or docs_fingerprint(docs)
+        if snapshot is not None and snapshot.version == version:
+            return
+        with self._lock:
+            if self._snapshot is snapshot:  # nobody rebuilt while we waited
+                self._snapshot = self._build(docs, version)
+
+    def _terms_for(self, key: tuple[str, str]) -> tuple[np.ndarray, np.ndarray]:
+        cached = self._doc_terms.get(key)
+        if cached is None:
+            counts = Counter(tokenize(f"{key[0]} {key[1]}"))
+            ids = np.fromiter((self._vocab.setdefault(t, len(self._vocab)) for t in counts), dtype=np.int32, count=len(counts))
+            cached = (ids, np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            self._doc_terms[key] = cached
+        return cached
+
+    def _build(self, docs: list, version: str) -> _Snapshot:
+        keys = [(str(d.get("name") or ""), str(d.get("description") or "")) for d in docs]
+        per_doc = [self._terms_for(key) for key in keys]
+        # Forget docs that left the catalog
+        live = set(keys)
+        for key in [k for k in self._doc_terms if k not in live]:
+            del self._doc_terms[key]
+
+        n_docs, n_terms = len(docs), len(self._vocab)
+        lengths = np.fromiter((len(ids) for ids, _ in per_doc), dtype=np.int64, count=n_docs)
+        terms = np.concatenate([ids for ids, _ in per_doc]) if n_docs else np.empty(0, np.int32)
+        tf = np.concatenate([tf for _, tf in per_doc]) if n_docs else np.empty(0, np.float32)
+        rows = np.repeat(np.arange(n_docs, dtype=np.int32), lengths)
+
+        df = np.bincount(terms, minlength=n_terms).astype(np.float32)
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+        weights = (1 + np.log(tf)) * idf[terms] if len(terms) else tf
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+        weights = weights / np.where(norms == 0, 1, norms)[rows]
+
+        order = np.argsort(terms, kind="stable")
+        term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=term_ptr[1:])
+        return _Snapshot(
+            version=version,
+            docs=docs,
+            vocab=dict(self._vocab),
+            idf=idf,
+            term_ptr=term_ptr,
+            doc_ids=rows[order],
+            weights=weights[order].astype(np.float32),
+        )
+
+    # -----------------------------------------------------
+    #  Query: member query terms + context keyword terms form one
+    #  sparse query vector, scored against every doc in a single
+    #  bincount over the matching postings.
+    # -----------------------------------------------------
+    def search(self, member_query: str, context: str = "general", k: int = RETRIEVAL_TOP_K) -> list:
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot.docs:
+            return []
+
+        query_weights: Counter[int] = Counter()
+        for term in tokenize(member_query):
+            if term in snapshot.vocab:
+                query_weights[snapshot.vocab[term]] += 1.0
+        for keyword in CONTEXT_KEYWORDS.get(context, []):
+            for term in tokenize(keyword):
+                if term in snapshot.vocab:
+                    query_weights[snapshot.vocab[term]] += CONTEXT_TERM_WEIGHT
+        if not query_weights:
+            return []
+
+        term_ids = np.fromiter(query_weights.keys(), dtype=np.int64)
+        q = np.fromiter(query_weights.values(), dtype=np.float32) * snapshot.idf[term_ids]
+        starts, ends = snapshot.term_ptr[term_ids], snapshot.term_ptr[term_ids + 1]
+        spans = [np.arange(s, e) for s, e in zip(starts, ends)]
+        positions = np.concatenate(spans)
+        if not len(positions):
+            return []
+        q_per_posting = np.repeat(q, ends - starts)
+        scores = np.bincount(
+            snapshot.doc_ids[positions],
+            weights=snapshot.weights[positions] * q_per_posting,
+            minlength=len(snapshot.docs),
+        )
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [snapshot.docs[i] for i in top]
+
+
+retrieval_index = RetrievalIndex()
+
+
+def retrieve_docs(all_docs: list, member_query: str, context: str, k: int = RETRIEVAL_TOP_K, version: str | None = None) -> list:
+    """Top-k docs for the query + context; keyword filter if nothing scores."""
+    retrieval_index.update(all_docs, version)
+    return retrieval_index.search(member_query, context, k) or filter_docs(all_docs, context, version)[:k]
@@ -0,0 +1,396 @@
+import asyncio
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Any
+
+import numpy as np
+
+from catalog_cache import CatalogCache, CatalogEntry
+from catalog_versions import CATALOG_HISTORY_VERSIONS, CatalogVersion
+from doc_index import CONTEXT_KEYWORDS, CatalogIndex
+from metrics import CATALOG_CACHE
+from response_bytes import EncodedBody, dumps
+
+# ---------------------------------------------------------
+#  Shared catalog tuning — override via environment
+# ---------------------------------------------------------
+SHARED_CATALOG_DIR = os.getenv("SHARED_CATALOG_DIR", "")  # unset → per-worker CatalogCache
+SHARED_CATALOG_POLL_SECONDS = float(os.getenv("SHARED_CATALOG_POLL_SECONDS", "1"))
+SHARED_CATALOG_WAIT_SECONDS = float(os.getenv("SHARED_CATALOG_WAIT_SECONDS", "10"))  # cold start
+SHARED_CATALOG_RETRY_SECONDS = float(os.getenv("SHARED_CATALOG_RETRY_SECONDS", "2"))  # first retry; doubles up to the TTL
+
+MAGIC = b"BHCAT1\n"
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "refresher.lock"
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def snapshot_name(version: int, content_hash: str) -> str:
+    return f"catalog-{version:08d}-{content_hash[:12]}.snap"
+
+
+def _data_start(header_length: int) -> int:
+    start = len(MAGIC) + 8 + header_length
+    return start + (-start % 8)
+
+
+# ---------------------------------------------------------
+#  Snapshot file (immutable, one per catalog version)
+#
+#    MAGIC | u64 header length | header JSON | 8-byte aligned sections
+#
+#  Sections: the full catalog and every ?context= variant, already
+#  serialized and compressed (<variant>/identity|gzip|br); each doc's
+#  JSON back to back ("docs") with u64 offsets; u32 owning category
+#  per doc; u32 doc ids per context; and the per-doc hashes used for
+#  ?since= diffs. Written to a temp file and renamed into place.
+# ---------------------------------------------------------
+def write_snapshot(directory: str, entry: CatalogEntry, version: CatalogVersion) -> str:
+    catalog = entry.data
+    index = CatalogIndex(catalog)
+    sections: list[tuple[str, bytes]] = []
+    bodies: dict[str, str] = {}
+    for variant, obj in [("", catalog)] + [(context, index.select(context)) for context in CONTEXT_KEYWORDS]:
+        body = EncodedBody.encode(obj)
+        bodies[variant] = body.etag
+        sections += [(f"{variant}/{coding}", getattr(body, coding)) for coding in ENCODINGS if getattr(body, coding) is not None]
+
+    docs = [dumps(doc) for doc in index.index.docs]
+    offsets = np.zeros(len(docs) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(doc) for doc in docs], dtype=np.uint64)
+    sections += [
+        ("docs", b"".join(docs)),
+        ("doc_offsets", offsets.tobytes()),
+        ("owners", np.asarray(index.owners, dtype=np.uint32).tobytes()),
+        ("doc_hashes", dumps(list(version.doc_hashes.items()))),
+    ]
+    sections += [(f"context/{context}", np.asarray(ids, dtype=np.uint32).tobytes())
+                 for context, ids in index.index.by_context.items()]
+
+    layout, position = {}, 0
+    for name, data in sections:
+        position += -position % 8
+        layout[name] = (position, len(data))
+        position += len(data)
+
+    header = dumps({
+        "version": version.version,
+        "hash": version.hash,
+        "etag": entry.etag,
+        "last_modified": entry.last_modified,
+        # Wall clock, so any process can tell how old the upstream copy is
+        "fetched_at": time.time() - (time.monotonic() - entry.fetched_at),
+        "doc_count": len(docs),
+        "categories": [{**c, "Docs": []} if isinstance(c, dict) else c for c in catalog],
+        "bodies": bodies,
+        "sections": layout,
+    })
+    name = snapshot_name(version.version, version.hash)
+    path = os.path.join(directory, name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        start = _data_start(len(header))
+        for section, data in sections:
+            f.write(b"\0" * (start + layout[section][0] - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return name
+
+
+def publish_pointer(directory: str, name: str) -> None:
+    # Readers see either the old name or the new one, never a torn write
+    path = os.path.join(directory, POINTER_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_pointer(directory: str) -> str | None:
+    try:
+        with open(os.path.join(directory, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def find_snapshot(directory: str, version: int) -> str | None:
+    matches = glob.glob(os.path.join(directory, f"catalog-{version:08d}-*.snap"))
+    return matches[0] if matches else None
+
+
+def prune_snapshots(directory: str, keep: int = CATALOG_HISTORY_VERSIONS) -> None:
+    # Old versions stay around for ?since= diffs; workers still mapping
+    # a removed file keep reading it until they swap
+    for path in sorted(glob.glob(os.path.join(directory, "catalog-*.snap")))[:-keep]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------------------------------------
+#  Read-only view of one snapshot file
+#
+#  Everything is sliced straight out of the mapping: pre-encoded
+#  bodies are memoryviews, index arrays are np.frombuffer views, and
+#  docs are decoded one by one only when a request needs them. The
+#  page cache is shared, so N workers hold one copy.
+# ---------------------------------------------------------
+class SharedSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+        (length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        self._view = memoryview(self._map)[_data_start(length):]
+        self._sections = header["sections"]
+
+        self.version: int = header["version"]
+        self.hash: str = header["hash"]
+        self.etag: str | None = header["etag"]
+        self.last_modified: str | None = header["last_modified"]
+        self.fetched_at: float = header["fetched_at"]
+        self.doc_count: int = header["doc_count"]
+        self.categories: list = header["categories"]
+        self.bodies = {
+            variant: EncodedBody(etag=etag, **{
+                coding: self.section(f"{variant}/{coding}")
+                for coding in ENCODINGS if f"{variant}/{coding}" in self._sections
+            })
+            for variant, etag in header["bodies"].items()
+        }
+        self.offsets = np.frombuffer(self.section("doc_offsets"), dtype=np.uint64)
+        self.owners = np.frombuffer(self.section("owners"), dtype=np.uint32)
+        self.by_context = {
+            context: np.frombuffer(self.section(f"context/{context}"), dtype=np.uint32)
+            for context in CONTEXT_KEYWORDS
+        }
+
+    def section(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def doc(self, i: int) -> Any:
+        return json.loads(bytes(self.section("docs")[int(self.offsets[i]):int(self.offsets[i + 1])]))
+
+    def doc_hashes(self) -> list[tuple[str, str]]:
+        return json.loads(bytes(self.section("doc_hashes")))
+
+    def catalog(self) -> list:
+        return json.loads(bytes(self.bodies[""].identity))
+
+    # -----------------------------------------------------
+    #  Same results as CatalogIndex.select / CatalogVersions.diff
+    # -----------------------------------------------------
+    def doc_ids(self, context: str) -> Any:
+        ids = self.by_context.get(context)
+        return ids if ids is not None and len(ids) else range(self.doc_count)
+
+    def select(self, context: str | None = None, fields: list[str] | None = None, limit: int | None = None) -> list:
+        ids = self.doc_ids(context) if context else range(self.doc_count)
+        if limit is not None:
+            ids = ids[:limit]
+        grouped: dict[int, list] = {position: [] for position in range(len(self.categories))}
+        for i in ids:
+            doc = self.doc(i)
+            if fields:
+                doc = {field: doc[field] for field in fields if field in doc}
+            grouped[int(self.owners[i])].append(doc)
+        return [
+            {**category, "Docs": grouped[position]} if isinstance(category, dict) else category
+            for position, category in enumerate(self.categories)
+        ]
+
+    def diff(self, since: int, fields: list[str] | None = None) -> dict:
+        # Same shape as CatalogVersions.diff: docs in added/changed, keys in removed
+        def project(i: int) -> Any:
+            doc = self.doc(i)
+            if fields and isinstance(doc, dict):
+                return {field: doc[field] for field in fields if field in doc}
+            return doc
+
+        # Older versions are read from their own (still kept) snapshot file
+        path = self.path if since == self.version else find_snapshot(os.path.dirname(self.path), since)
+        base = None
+        if path is not None:
+            try:
+                base = dict(SharedSnapshot(path).doc_hashes())
+            except (OSError, ValueError):
+                pass
+        result = {
+            "version": self.version,
+            "hash": self.hash,
+            "since": since,
+            "full": base is None,
+            "added": [],
+            "changed": [],
+            "removed": [],
+        }
+        current = self.doc_hashes()
+        if base is None:
+            result["added"] = [project(i) for i in range(self.doc_count)]
+            return result
+        for i, (key, value) in enumerate(current):
+            previous = base.get(key)
+            if previous is None:
+                result["added"].append(project(i))
+            elif previous != value:
+                result["changed"].append(project(i))
+        keys = {key for key, _ in current}
+        result["removed"] = [key for key in base if key not in keys]
+        return result
+
+
+# ---------------------------------------------------------
+#  One catalog per host, shared by every worker
+#
+#  Workers race for an flock on LOCK_FILE; the holder is the only
+#  refresher: it runs the CatalogCache (conditional GETs, breaker,
+#  SQLite snapshot) once per TTL and publishes each new version as a
+#  snapshot file, then swaps POINTER_FILE. Every worker polls the
+#  pointer and maps new files read-only. When the refresher dies its
+#  lock is released and the next worker to poll takes over.
+# ---------------------------------------------------------
+class SharedCatalog:
+    def __init__(
+        self,
+        directory: str,
+        cache: CatalogCache,
+        poll: float = SHARED_CATALOG_POLL_SECONDS,
+        wait: float = SHARED_CATALOG_WAIT_SECONDS,
+    ):
+        self.directory = directory
+        self.cache = cache
+        self.poll = poll
+        self.wait = wait
+        self.snapshot: SharedSnapshot | None = None
+        self.refresher = False
+        self._lock_fd: int | None = None
+        self._ready = asyncio.Event()
+        self._wait_until = 0.0
+        self._tasks: list[asyncio.Task] = []
+        os.makedirs(directory, exist_ok=True)
+
+    async def start(self) -> None:
+        self._wait_until = time.monotonic() + self.wait
+        self._check()
+        self._tasks.append(asyncio.create_task(self._watch()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # releases the flock
+            self._lock_fd = None
+            self.refresher = False
+
+    async def get(self) -> SharedSnapshot | None:
+        # None → no snapshot published yet; the caller falls back to its own cache
+        if self.snapshot is None:
+            left = self._wait_until - time.monotonic()
+            if left > 0:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), left)
+                except asyncio.TimeoutError:
+                    pass
+        if self.snapshot is not None:
+            CATALOG_CACHE.inc(result="shared")
+        return self.snapshot
+
+    # -----------------------------------------------------
+    #  Every worker: follow the pointer, stand by as refresher
+    # -----------------------------------------------------
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll)
+            try:
+                self._check()
+            except Exception as e:
+                print(f"Shared catalog check failed: {e!r}")
+
+    def _check(self) -> None:
+        self._map_current()
+        if not self.refresher and self._try_lock():
+            self.refresher = True
+            print(f"Shared catalog: worker {os.getpid()} is the refresher")
+            self._tasks.append(asyncio.create_task(self._refresh_loop()))
+
+    def _map_current(self) -> None:
+        name = read_pointer(self.directory)
+        if name is None or (self.snapshot is not None and os.path.basename(self.snapshot.path) == name):
+            return
+        # Plain attribute swap: in-flight requests finish on the old mapping
+        self.snapshot = SharedSnapshot(os.path.join(self.directory, name))
+        self._ready.set()
+
+    def _try_lock(self) -> bool:
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    # -----------------------------------------------------
+    #  Refresher only
+    # -----------------------------------------------------
+    async def _refresh_loop(self) -> None:
+        await self.cache.start()
+        snapshot = self.snapshot
+        delay = 0.0
+        if snapshot is not None:
+            # Carry on from the published version instead of renumbering
+            self.cache.versions.restore({"version": snapshot.version, "hash": snapshot.hash, "doc_hashes": dict(snapshot.doc_hashes())})
+            if self.cache.entry is None:
+                self.cache.restore(await asyncio.to_thread(snapshot.catalog), snapshot.etag, snapshot.last_modified)
+            # A fresh enough file (e.g. after a failover) waits out its TTL
+            delay = max(0.0, self.cache.ttl - (time.time() - snapshot.fetched_at))
+
+        retry = SHARED_CATALOG_RETRY_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            if await self._refresh_and_publish():
+                delay, retry = self.cache.ttl, SHARED_CATALOG_RETRY_SECONDS
+            else:
+                # Workers stop waiting after SHARED_CATALOG_WAIT_SECONDS — don't leave them a whole TTL
+                delay, retry = min(retry, self.cache.ttl), retry * 2
+
+    async def _refresh_and_publish(self) -> bool:
+        ok = True
+        try:
+            await self.cache.refresh()
+        except Exception:
+            ok = False  # already logged by the cache; publish whatever it still holds
+        entry, version = self.cache.entry, self.cache.versions.current
+        if entry is None or version is None:
+            return False
+        if self.snapshot is None or self.snapshot.hash != version.hash:
+            try:
+                await asyncio.to_thread(self._publish, entry, version)
+                self._map_current()
+            except Exception as e:
+                print(f"Shared catalog publish failed: {e!r}")
+                return False
+        return ok
+
+    def _publish(self, entry: CatalogEntry, version: CatalogVersion) -> None:
+        name = write_snapshot(self.directory, entry, version)
+        publish_pointer(self.directory, name)
+        prune_snapshots(self.directory)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# ---------------------------------------------------------
+#  Snapshot tuning — override via environment
+# ---------------------------------------------------------
+SNAPSHOT_DB_PATH = os.getenv("SNAPSHOT_DB_PATH", "")  # e.g. snapshots.db; unset → no store
+SNAPSHOT_REFRESH_AFTER = float(os.getenv("SNAPSHOT_REFRESH_AFTER", "300"))
+
+
+def payload_version(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+@dataclass
+class Snapshot:
+    kind: str
+    key: str
+    version: str
+    payload: Any
+    updated_at: float  # wall clock
+
+
+# ---------------------------------------------------------
+#  Last-good-data store (SQLite, WAL)
+#
+#  One row per (kind, key): "catalog" payloads, per-context
+#  "resource" docs, per-context "prompt" templates. Each row
+#  carries a version stamp (content hash unless given).
+# ---------------------------------------------------------
+class SnapshotStore:
+    def __init__(self, path: str = SNAPSHOT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, version TEXT NOT NULL, "
+            "payload TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+
+    def get(self, kind: str, key: str) -> Snapshot | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, payload, updated_at FROM snapshots WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return Snapshot(kind, key, row[0], json.loads(row[1]), row[2])
+
+    def put(self, kind: str, key: str, payload: Any, version: str | None = None) -> str:
+        version = version or payload_version(payload)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (kind, key, version, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, version, json.dumps(payload, separators=(",", ":")), time.time()),
+            )
+            self._conn.commit()
+        return version
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------------------------------------------------
+#  Snapshot-first reads for one kind
+#
+#  A stored snapshot is returned immediately; if it is older than
+#  `refresh_after` a background thread re-fetches and re-stores it.
+#  Only a cold key blocks on `fetch`. A failed refresh leaves the
+#  last good snapshot in place.
+#
+#  Decoded snapshots are kept in memory; SQLite is only read for a
+#  key this process hasn't seen yet. Every new version goes through
+#  put(), which replaces the in-memory copy too.
+# ---------------------------------------------------------
+class SnapshotCache:
+    def __init__(self, store: SnapshotStore, kind: str, refresh_after: float = SNAPSHOT_REFRESH_AFTER):
+        self.store = store
+        self.kind = kind
+        self.refresh_after = refresh_after
+        self._refreshing: set[str] = set()
+        self._snapshots: dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key: str, fetch: Callable[[], Any] | None = None) -> Any | None:
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = self.store.get(self.kind, key)
+            if snapshot is None:
+                return None
+            with self._lock:
+                # A put() that landed meanwhile is newer than this read
+                snapshot = self._snapshots.setdefault(key, snapshot)
+        if fetch is not None and time.time() - snapshot.updated_at > self.refresh_after:
+            self._refresh_in_background(key, fetch)
+        return snapshot.payload
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        payload = self.peek(key, fetch)
+        if payload is not None:
+            return payload
+        payload = fetch()
+        self.put(key, payload)
+        return payload
+
+    def put(self, key: str, payload: Any) -> None:
+        version = self.store.put(self.kind, key, payload)
+        previous = self._snapshots.get(key)
+        if previous is not None and previous.version == version:
+            # Same content — keep the decoded object, just restart its clock
+            payload = previous.payload
+        with self._lock:
+            self._snapshots[key] = Snapshot(self.kind, key, version, payload, time.time())
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                self.put(key, fetch())
+            except Exception as e:
+                print(f"Snapshot refresh failed for {self.kind}:{key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
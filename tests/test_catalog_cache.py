@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import httpx
+
+from catalog_cache import CatalogCache
+
+CATALOG = [{"title": "Resources", "Docs": [{"name": "A", "description": "first"}]}]
+
+
+class FakeUpstream:
+    """httpx transport for the catalog source: ETag'd JSON, 304 on a matching If-None-Match.
+    While `gate` is set, responses wait for it."""
+
+    def __init__(self, catalog=CATALOG, etag='"v1"'):
+        self.catalog, self.etag = catalog, etag
+        self.requests: list[httpx.Request] = []
+        self.gate: asyncio.Event | None = None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.gate is not None:
+            await self.gate.wait()
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, headers={"ETag": self.etag}, content=json.dumps(self.catalog).encode())
+
+
+def cache_for(upstream: FakeUpstream, **kwargs) -> CatalogCache:
+    cache = CatalogCache("http://upstream.invalid/catalog", **kwargs)
+    cache._client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle))
+    return cache
+
+
+def age(cache: CatalogCache, seconds: float) -> None:
+    cache._entry.fetched_at -= seconds
+
+
+def test_fresh_entry_is_served_without_fetching():
+    async def main():
+        upstream = FakeUpstream()
+        cache = cache_for(upstream, ttl=60)
+        first = await cache.get()
+        assert first == CATALOG
+        assert all([await cache.get() is first for _ in range(5)])
+        assert len(upstream.requests) == 1
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_stale_entry_is_served_while_it_refreshes():
+    async def main():
+        upstream = FakeUpstream()
+        cache = cache_for(upstream, ttl=60, stale=600)
+        first = await cache.get()
+        age(cache, 120)
+        upstream.catalog = [{"title": "Resources", "Docs": [{"name": "B"}]}]
+        upstream.etag = '"v2"'
+        upstream.gate = asyncio.Event()
+        # Upstream is stuck, callers still get the old payload at once
+        assert await asyncio.wait_for(cache.get(), 1) is first
+        assert await asyncio.wait_for(cache.get(), 1) is first
+        upstream.gate.set()
+        await cache._inflight
+        assert await cache.get() == upstream.catalog
+        assert len(upstream.requests) == 2
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_expired_entry_revalidates_with_a_conditional_request():
+    async def main():
+        upstream = FakeUpstream()
+        cache = cache_for(upstream, ttl=60, stale=0)
+        first = await cache.get()
+        age(cache, 120)
+        # 304 — the parsed payload is kept and its age reset
+        assert await cache.get() is first
+        assert upstream.requests[-1].headers["If-None-Match"] == '"v1"'
+        assert cache.version == 1
+        assert await cache.get() is first
+        assert len(upstream.requests) == 2
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_failed_refresh_keeps_serving_the_last_payload():
+    async def main():
+        upstream = FakeUpstream()
+        cache = cache_for(upstream, ttl=60, stale=0)
+        first = await cache.get()
+        age(cache, 120)
+
+        async def down(request):
+            raise httpx.ConnectError("upstream down", request=request)
+
+        cache._client = httpx.AsyncClient(transport=httpx.MockTransport(down))
+        assert await cache.get() is first
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def main():
+        upstream = FakeUpstream()
+        upstream.gate = asyncio.Event()
+        cache = cache_for(upstream)
+        callers = [asyncio.create_task(cache.get()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        upstream.gate.set()
+        results = await asyncio.gather(*callers)
+        assert len(upstream.requests) == 1
+        assert all(result is results[0] for result in results)
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch():
+    async def main():
+        upstream = FakeUpstream()
+        upstream.gate = asyncio.Event()
+        cache = cache_for(upstream)
+        leaving = asyncio.create_task(cache.get())
+        staying = asyncio.create_task(cache.get())
+        await asyncio.sleep(0.01)
+        leaving.cancel()  # e.g. a client that disconnected
+        upstream.gate.set()
+        assert await staying == CATALOG
+        assert len(upstream.requests) == 1
+        await cache.close()
+
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+import json
+import random
+
+import pytest
+
+from catalog_cache import normalize_catalog
+from catalog_stream import CatalogBuilder, CatalogParser
+
+
+def random_value(rnd: random.Random, depth: int = 0):
+    roll = rnd.random()
+    if depth > 2 or roll < 0.4:
+        return rnd.choice([0, 7, -12, 1.5, -2.5e3, 123456789, True, False, None, "", "plain", 'q"uo\\te', "é ✓ 🙂"])
+    if roll < 0.7:
+        return [random_value(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+    return {f"k{i}": random_value(rnd, depth + 1) for i in range(rnd.randint(0, 3))}
+
+
+def random_catalog(rnd: random.Random):
+    def category():
+        meta = {"title": random_value(rnd), "summary": random_value(rnd)}
+        docs = [random_value(rnd) for _ in range(rnd.randint(0, 4))]
+        return {**meta, "Docs": docs} if rnd.random() < 0.5 else {"Docs": docs, **meta}
+
+    roll = rnd.random()
+    if roll < 0.15:
+        return category()  # a single top-level category
+    if roll < 0.2:
+        return random_value(rnd)
+    return [category() if rnd.random() < 0.8 else random_value(rnd) for _ in range(rnd.randint(0, 4))]
+
+
+def split(raw: bytes, rnd: random.Random) -> list[bytes]:
+    if len(raw) < 2:
+        return [raw]
+    cuts = sorted(rnd.sample(range(1, len(raw)), min(len(raw) - 1, rnd.randint(0, 12))))
+    return [raw[a:b] for a, b in zip([0] + cuts, cuts + [len(raw)])]
+
+
+def parse(chunks) -> list:
+    parser, builder = CatalogParser(), CatalogBuilder()
+    for chunk in chunks:
+        builder.extend(parser.feed(chunk))
+    builder.extend(parser.close())
+    return builder.catalog
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_json_loads_at_any_chunk_boundary(seed):
+    rnd = random.Random(seed)
+    for _ in range(100):
+        data = random_catalog(rnd)
+        raw = json.dumps(data, ensure_ascii=rnd.random() < 0.5, indent=rnd.choice([None, 1])).encode()
+        assert parse(split(raw, rnd)) == normalize_catalog(json.loads(raw))
+
+
+def test_one_byte_chunks():
+    data = [{"title": "t", "Docs": [{"name": "a", "n": 12.5e-3}, {"name": "ü"}]}, {"title": "u", "x": [1, 2]}]
+    raw = json.dumps(data, ensure_ascii=False).encode()
+    assert parse(raw[i:i + 1] for i in range(len(raw))) == data
+
+
+def test_numbers_cut_at_a_chunk_edge_wait_for_more():
+    assert parse([b'[{"n": 1', b'23, "f": 1.', b'5, "Docs": []}]']) == [{"n": 123, "f": 1.5, "Docs": []}]
+
+
+def test_events_arrive_as_docs_complete():
+    parser = CatalogParser()
+    assert parser.feed(b'[{"title": "t", "Docs": [{"name": "a"}, {"na') == [("doc", 0, {"name": "a"})]
+    assert parser.feed(b'me": "b"}]}]') == [("doc", 0, {"name": "b"}), ("category", 0, {"title": "t", "Docs": []})]
+    assert parser.close() == []
+
+
+def test_large_value_is_not_redecoded_per_chunk(monkeypatch):
+    raw = json.dumps([{"title": "t", "extra": [{"name": f"doc {i}"} for i in range(20000)]}]).encode()
+    parser = CatalogParser()
+    calls = 0
+    raw_decode = parser._decoder.raw_decode
+
+    def counting(*args):
+        nonlocal calls
+        calls += 1
+        return raw_decode(*args)
+
+    monkeypatch.setattr(parser._decoder, "raw_decode", counting)
+    builder = CatalogBuilder()
+    for start in range(0, len(raw), 1024):
+        builder.extend(parser.feed(raw[start:start + 1024]))
+    builder.extend(parser.close())
+    assert builder.catalog == json.loads(raw)
+    assert len(raw) // 1024 > 300
+    assert calls < 40
+
+
+def test_utf8_bom_is_skipped():
+    raw = b'\xef\xbb\xbf[{"title": "t", "Docs": [1]}]'
+    assert parse([raw]) == [{"title": "t", "Docs": [1]}]
+    assert parse([raw[:2], raw[2:]]) == [{"title": "t", "Docs": [1]}]
+
+
+@pytest.mark.parametrize("raw", [
+    b'{"a": 1 "b": 2}',
+    b'[{"a": 1 "Docs": []}]',
+    b'[{"Docs": [1] "a": 2}]',
+    b'[{, "a": 1}]',
+    b'[{"a": 1,}]',
+    b'[{"Docs": [1 2]}]',
+    b'[{"Docs": [1,]}]',
+    b'[1 2]',
+    b'[1,]',
+    b'[{"a": 1}',
+    b'[{"a": 1}] x',
+    b'[{"a": 1.}]',
+    b'',
+])
+def test_malformed_json_is_rejected(raw):
+    with pytest.raises(ValueError):
+        parse(split(raw, random.Random(0)))
+    with pytest.raises(ValueError):
+        json.loads(raw)
+
@@ -0,0 +1,95 @@
+import copy
+
+from catalog_versions import CatalogVersions
+
+
+def catalog(*docs, title="Resources"):
+    return [{"title": title, "Docs": [dict(doc) for doc in docs]}]
+
+
+A = {"name": "A", "description": "first", "link": "https://a"}
+B = {"name": "B", "description": "second", "link": "https://b"}
+C = {"name": "C", "description": "third", "link": "https://c"}
+
+
+def test_identical_content_keeps_its_version():
+    versions = CatalogVersions()
+    first = versions.observe(catalog(A, B))
+    assert first.version == 1
+    assert versions.observe(copy.deepcopy(catalog(A, B))).version == 1
+    assert versions.observe(catalog(A, B, title="Renamed")).version == 2
+
+
+def test_hash_matches_across_processes_when_versions_do_not():
+    # Two workers that saw different histories number the same catalog differently
+    one, other = CatalogVersions(), CatalogVersions()
+    other.observe(catalog(A))
+    assert one.observe(catalog(A, B)).version != other.observe(catalog(A, B)).version
+    assert one.current.hash == other.current.hash
+
+
+def test_diff_lists_added_changed_and_removed_docs():
+    versions = CatalogVersions()
+    versions.observe(catalog(A, B))
+    versions.observe(catalog({**A, "description": "updated"}, C))
+    diff = versions.diff(1)
+    assert diff["version"] == 2 and diff["since"] == 1 and not diff["full"]
+    assert diff["added"] == [C]
+    assert diff["changed"] == [{**A, "description": "updated"}]
+    assert diff["removed"] == ["B"]
+
+
+def test_diff_against_current_version_is_empty():
+    versions = CatalogVersions()
+    versions.observe(catalog(A, B))
+    assert versions.diff(1) | {"hash": None} == {
+        "version": 1, "hash": None, "since": 1, "full": False, "added": [], "changed": [], "removed": [],
+    }
+
+
+def test_diff_across_several_versions():
+    versions = CatalogVersions()
+    versions.observe(catalog(A))
+    versions.observe(catalog(A, B))
+    versions.observe(catalog(B, C))
+    diff = versions.diff(1)
+    assert diff["added"] == [B, C] and diff["removed"] == ["A"] and diff["changed"] == []
+
+
+def test_unknown_or_expired_versions_get_the_full_catalog():
+    versions = CatalogVersions(history=2)
+    for docs in ([A], [A, B], [A, B, C]):
+        versions.observe(catalog(*docs))
+    for since in (1, 99):
+        diff = versions.diff(since)
+        assert diff["full"] and diff["added"] == [A, B, C] and diff["removed"] == []
+    assert not versions.diff(2)["full"]
+
+
+def test_diff_projects_fields():
+    versions = CatalogVersions()
+    versions.observe(catalog(A))
+    versions.observe(catalog({**A, "link": "https://new"}, B))
+    diff = versions.diff(1, ["name"])
+    assert diff["added"] == [{"name": "B"}] and diff["changed"] == [{"name": "A"}]
+
+
+def test_repeated_names_are_tracked_separately():
+    versions = CatalogVersions()
+    versions.observe(catalog(A, {**A, "description": "copy"}))
+    versions.observe(catalog(A))
+    assert versions.diff(1)["removed"] == ["A#2"]
+
+
+def test_diff_before_any_catalog():
+    diff = CatalogVersions().diff(1)
+    assert diff["version"] == 0 and diff["hash"] is None and diff["added"] == []
+
+
+def test_restored_state_keeps_numbering_and_diffs():
+    original = CatalogVersions()
+    original.observe(catalog(A))
+    restored = CatalogVersions()
+    restored.restore(original.state())
+    assert restored.observe(catalog(A, B)).version == 2
+    assert restored.diff(1)["added"] == [B]
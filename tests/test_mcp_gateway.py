@@ -0,0 +1,113 @@
+import json
+
+import pytest
+import requests
+
+from mcp_gateway import INVALID_REQUEST, MCPClient
+from mcp_models import PromptsListResult, ToolsListResult
+
+
+class FakeSession:
+    """Stands in for requests.Session. Single calls are answered from `results`;
+    batches by `batch_reply`, which gets the request list and returns (status, body)."""
+
+    def __init__(self, batch_reply=None):
+        self.bodies: list = []
+        self.results = {
+            "tools/list": {"tools": [{"name": "catalog", "inputSchema": {}}]},
+            "prompts/list": {"prompts": [{"name": "router"}]},
+        }
+        self.batch_reply = batch_reply or (lambda requests: (200, [self.answer(r) for r in requests]))
+
+    def answer(self, request: dict) -> dict:
+        if request["method"] not in self.results:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": self.results[request["method"]]}
+
+    def post(self, url, data=None, timeout=None):
+        body = json.loads(data)
+        self.bodies.append(body)
+        status, payload = self.batch_reply(body) if isinstance(body, list) else (200, self.answer(body))
+        response = requests.Response()
+        response.status_code, response._content, response.url = status, json.dumps(payload).encode(), url
+        return response
+
+    @property
+    def batches(self) -> int:
+        return sum(isinstance(body, list) for body in self.bodies)
+
+
+def client_for(session: FakeSession) -> MCPClient:
+    client = MCPClient("http://gateway.invalid/", hedge=False)
+    client.session = session
+    return client
+
+
+CALLS = [("tools/list", {}, ToolsListResult), ("prompts/list", {}, PromptsListResult)]
+
+
+def test_batch_matches_responses_by_id():
+    # Answered out of order; results still follow the order of the calls
+    session = FakeSession(lambda requests: (200, [session.answer(r) for r in reversed(requests)]))
+    tools, prompts = client_for(session).batch(CALLS)
+    assert session.batches == 1 and len(session.bodies) == 1
+    assert tools.unwrap().tools[0].name == "catalog"
+    assert prompts.unwrap().prompts[0].name == "router"
+
+
+def test_batch_item_errors_stay_per_item():
+    # The second call gets no answer at all
+    session = FakeSession(lambda requests: (200, [session.answer(requests[0]), session.answer(requests[2])]))
+    client = client_for(session)
+    tools, missing, unknown = client.batch(CALLS[:1] + [("prompts/list", {}), ("nope/list", {})])
+    assert tools.unwrap().tools[0].name == "catalog"
+    assert missing.root["error"]["message"] == "No response for batch item"
+    assert unknown.root["error"]["message"] == "Method not found"
+    assert client.supports_batch
+
+
+@pytest.mark.parametrize("reply", [
+    lambda requests: (400, {"error": "arrays not accepted"}),
+    lambda requests: (501, {}),
+    lambda requests: (200, {"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "Invalid Request"}}),
+], ids=["400", "501", "-32600"])
+def test_rejected_batch_falls_back_to_single_calls(reply):
+    session = FakeSession(reply)
+    client = client_for(session)
+    tools, prompts = client.batch(CALLS)
+    assert tools.unwrap().tools[0].name == "catalog"
+    assert prompts.unwrap().prompts[0].name == "router"
+    assert not client.supports_batch
+    # Remembered — the next batch goes straight to single calls
+    client.batch(CALLS)
+    assert session.batches == 1 and len(session.bodies) == 5
+    assert client.breaker.state == "closed"
+
+
+@pytest.mark.parametrize("status", [401, 429, 503])
+def test_other_failures_fail_the_items_but_keep_batching(status):
+    session = FakeSession(lambda requests: (status, {}))
+    client = client_for(session)
+    results = client.batch(CALLS)
+    assert all(result.error is not None for result in results)
+    assert client.supports_batch
+    assert session.batches == 1 and len(session.bodies) == 1
+
+
+def test_notifications_in_a_batch_reach_listeners():
+    notification = {"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}
+    session = FakeSession(lambda requests: (200, [notification] + [session.answer(r) for r in requests]))
+    client = client_for(session)
+    seen = []
+    client.listeners.append(lambda message: 1 / 0)  # a failing listener doesn't stop the rest
+    client.listeners.append(seen.append)
+    tools, prompts = client.batch(CALLS)
+    assert seen == [notification]
+    assert tools.unwrap().tools and prompts.unwrap().prompts
+
+
+def test_single_call_batch_skips_the_array():
+    session = FakeSession()
+    (tools,) = client_for(session).batch(CALLS[:1])
+    assert tools.unwrap().tools[0].name == "catalog"
+    assert session.batches == 0
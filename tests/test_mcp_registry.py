@@ -0,0 +1,119 @@
+import json
+
+import pytest
+import requests
+
+import mcp_registry
+from mcp_gateway import MCPClient
+from mcp_models import CatalogToolResult
+from mcp_registry import CapabilityRegistry, ToolOutputError
+
+SCHEMA = {"type": "array", "items": {"type": "object", "required": ["title"]}}
+
+
+class FakeGateway:
+    """Stands in for requests.Session: answers JSON-RPC bodies from `handle`."""
+
+    def __init__(self):
+        self.methods: list[str] = []
+        self.notify_on_next_batch: list[dict] = []
+
+    def handle(self, request: dict) -> dict:
+        self.methods.append(request["method"])
+        results = {
+            "tools/list": {"tools": [{"name": "catalog", "inputSchema": {}, "outputSchema": SCHEMA}]},
+            "prompts/list": {"prompts": []},
+            "resources/list": {"resources": []},
+        }
+        return {"jsonrpc": "2.0", "id": request["id"], "result": results[request["method"]]}
+
+    def post(self, url, data=None, timeout=None):
+        body = json.loads(data)
+        if isinstance(body, list):
+            payload = [self.handle(item) for item in body] + self.notify_on_next_batch
+            self.notify_on_next_batch = []
+        else:
+            payload = self.handle(body)
+        response = requests.Response()
+        response.status_code, response._content, response.url = 200, json.dumps(payload).encode(), url
+        return response
+
+
+@pytest.fixture
+def gateway():
+    return FakeGateway()
+
+
+@pytest.fixture
+def registry(gateway):
+    client = MCPClient("http://gateway.invalid/", hedge=False)
+    client.session = gateway
+    return CapabilityRegistry(client, ttl=600)
+
+
+def count_validations(monkeypatch) -> list:
+    calls = []
+    best_match = mcp_registry.jsonschema.exceptions.best_match
+    monkeypatch.setattr(mcp_registry.jsonschema.exceptions, "best_match", lambda errors: calls.append(1) or best_match(errors))
+    return calls
+
+
+def test_first_lookup_fetches_every_list_in_one_batch(registry, gateway):
+    assert set(registry.tools()) == {"catalog"}
+    registry.prompts()
+    registry.resources()
+    assert sorted(gateway.methods) == ["prompts/list", "resources/list", "tools/list"]
+
+
+def test_payload_is_validated_once_per_key(registry, monkeypatch):
+    calls = count_validations(monkeypatch)
+    payload = [{"title": "t", "Docs": []}]
+    for _ in range(3):
+        registry.validate_tool_output("catalog", payload, "v1")
+    registry.validate_tool_output("catalog", payload, "v2")
+    registry.validate_tool_output("catalog", payload)  # no key → always validated
+    assert len(calls) == 3
+
+
+def test_invalid_payload_is_never_remembered(registry, monkeypatch):
+    calls = count_validations(monkeypatch)
+    for _ in range(2):
+        with pytest.raises(ToolOutputError, match="outputSchema at 0"):
+            registry.validate_tool_output("catalog", [{"Docs": []}], "v1")
+    assert len(calls) == 2
+
+
+def test_tool_result_key_follows_the_raw_text():
+    def result(text, meta=None):
+        return CatalogToolResult.model_validate({"content": [{"text": text}], **({"_meta": meta} if meta else {})})
+
+    same = json.dumps([{"title": "t"}])
+    assert result(same).content_key() == result(same).content_key()
+    assert result(same).content_key() != result(json.dumps([{"title": "u"}])).content_key()
+    # The relayed catalog hash wins; the per-process version number is ignored
+    assert result(same, {"catalogHash": "abc", "catalogVersion": 3}).content_key() == "catalog:abc"
+    assert result(same, {"catalogVersion": 3}).content_key() == result(same).content_key()
+
+
+def test_list_changed_during_a_refresh_survives_it(registry, gateway):
+    registry.tools()
+    registry.invalidate()
+    gateway.methods.clear()
+    # The notification rides in on the very batch that refreshes the lists
+    gateway.notify_on_next_batch = [{"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}]
+    registry.refresh()
+    assert len(gateway.methods) == 3
+    registry.prompts()
+    assert len(gateway.methods) == 3
+    registry.tools()
+    registry.tools()
+    assert gateway.methods[3:] == ["tools/list"]
+
+
+def test_list_changed_between_refreshes_expires_only_that_list(registry, gateway):
+    registry.tools()
+    gateway.methods.clear()
+    registry.client.notify({"jsonrpc": "2.0", "method": "notifications/prompts/list_changed"})
+    registry.tools()
+    registry.prompts()
+    assert gateway.methods == ["prompts/list"]
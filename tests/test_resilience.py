@@ -0,0 +1,283 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import resilience
+from mcp_gateway import MCPClient
+from metrics import HEDGED_REQUESTS
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline, hedged, remaining, time_left
+
+
+def hedges(label: str) -> float:
+    return HEDGED_REQUESTS._values.get((label,), 0.0)
+
+
+# ---------------------------------------------------------
+#  Circuit breaker
+# ---------------------------------------------------------
+def opened(breaker: CircuitBreaker) -> CircuitBreaker:
+    for _ in range(breaker.failures):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failures=3, reset_after=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the run
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_breaker_ignores_stragglers_while_open():
+    breaker = opened(CircuitBreaker("test", failures=2, reset_after=60))
+    breaker.record_success()
+    assert breaker.state == "open"
+
+
+def test_half_open_lets_exactly_one_trial_through():
+    breaker = opened(CircuitBreaker("test", failures=1, reset_after=0.02))
+    time.sleep(0.03)
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes():
+    breaker = opened(CircuitBreaker("test", failures=1, reset_after=0.02))
+    time.sleep(0.03)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_half_open_trial_failure_reopens():
+    breaker = opened(CircuitBreaker("test", failures=3, reset_after=0.02))
+    time.sleep(0.03)
+    assert breaker.allow()
+    breaker.record_failure()  # one failure is enough from half-open
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    time.sleep(0.03)
+    assert breaker.allow()
+
+
+def test_released_trial_can_be_retried():
+    breaker = opened(CircuitBreaker("test", failures=1, reset_after=0.02))
+    time.sleep(0.03)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+# ---------------------------------------------------------
+#  Hedged calls
+# ---------------------------------------------------------
+def test_fast_call_is_not_hedged():
+    calls = []
+    assert hedged(lambda: calls.append(1) or "ok", 0.5, "test-fast") == "ok"
+    assert calls == [1]
+    assert hedges("test-fast") == 0
+
+
+def test_slow_primary_is_hedged_and_first_success_wins():
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.01)
+        return "slow" if first else "fast"
+
+    started = time.perf_counter()
+    assert hedged(fn, 0.05, "test-slow") == "fast"
+    assert time.perf_counter() - started < 0.5
+    assert len(calls) == 2
+    assert hedges("test-slow") == 1
+
+
+def test_failed_copy_falls_back_to_the_other():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise ValueError("primary failed")
+        time.sleep(0.2)
+        return "hedge"
+
+    assert hedged(fn, 0.02, "test-fallback") == "hedge"
+
+
+def test_both_copies_failing_raises():
+    def fn():
+        time.sleep(0.05)
+        raise ValueError("down")
+
+    with pytest.raises(ValueError, match="down"):
+        hedged(fn, 0.01, "test-fail")
+
+
+def test_hedged_call_gives_up_at_the_deadline():
+    with deadline(0.1):
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            hedged(lambda: time.sleep(1.0), 0.02, "test-deadline")
+    assert time.perf_counter() - started < 0.5
+
+
+def test_queue_time_does_not_count_toward_the_hedge_delay():
+    release = threading.Event()
+    workers = resilience._hedge_pool._max_workers
+    blockers = [resilience._hedge_pool.submit(release.wait) for _ in range(workers)]
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    try:
+        # Queued for ~0.2s behind the blockers, then finishes well inside the delay
+        assert hedged(lambda: time.sleep(0.01) or "ok", 0.1, "test-queued") == "ok"
+    finally:
+        release.set()
+        timer.cancel()
+    for blocker in blockers:
+        blocker.result()
+    assert hedges("test-queued") == 0
+
+
+def test_concurrent_callers_are_not_all_hedged():
+    calls = []
+    lock = threading.Lock()
+
+    def backend():
+        with lock:
+            calls.append(1)
+        time.sleep(0.1)
+        return 1
+
+    with ThreadPoolExecutor(48) as callers:
+        assert sum(callers.map(lambda _: hedged(backend, 0.25, "test-load"), range(48))) == 48
+    assert len(calls) == 48
+    assert hedges("test-load") == 0
+
+
+# ---------------------------------------------------------
+#  Deadline propagation
+# ---------------------------------------------------------
+def test_no_deadline_leaves_timeouts_alone():
+    assert remaining() is None
+    assert time_left(30) == 30
+
+
+def test_nested_deadlines_only_tighten():
+    with deadline(10):
+        outer = remaining()
+        with deadline(0.5):
+            assert remaining() <= 0.5
+            with deadline(5):
+                assert remaining() <= 0.5
+        assert remaining() == pytest.approx(outer, abs=0.1)
+    assert remaining() is None
+
+
+def test_time_left_caps_timeouts_and_raises_once_spent():
+    with deadline(0.5):
+        assert time_left(30) <= 0.5
+        assert time_left(0.1) == 0.1
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            time_left(30)
+
+
+def test_deadline_follows_into_hedge_workers_and_threads():
+    seen = []
+    with deadline(0.5):
+        hedged(lambda: seen.append(remaining()), 1.0, "test-propagation")
+
+        async def main():
+            seen.append(await asyncio.to_thread(remaining))
+
+        asyncio.run(main())
+    assert len(seen) == 2 and all(left is not None and 0 < left <= 0.5 for left in seen)
+
+
+@pytest.fixture
+def slow_gateway():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(0.3)
+            body = b'{"jsonrpc": "2.0", "id": "1", "result": {}}'
+            try:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # the client gave up first
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_deadline_bounds_gateway_calls_without_tripping_the_breaker(slow_gateway):
+    client = MCPClient(slow_gateway, hedge=False)
+    for _ in range(client.breaker.failures + 1):
+        started = time.perf_counter()
+        with deadline(0.05), pytest.raises(DeadlineExceeded):
+            client.call("tools/list")
+        assert time.perf_counter() - started < 0.25
+    assert client.breaker.state == "closed"
+
+
+def test_gateway_timeouts_at_the_configured_value_still_count(slow_gateway):
+    client = MCPClient(slow_gateway, read_timeout=0.05, hedge=False)
+    for _ in range(client.breaker.failures):
+        with pytest.raises(Exception):
+            client.call("tools/list")
+    assert client.breaker.state == "open"
+
+
+def test_batch_501_falls_back_without_tripping_the_breaker():
+    class Gateway:
+        def post(self, url, data, timeout):
+            body = json.loads(data)
+            response = requests.Response()
+            response.url, response.status_code = url, 501 if isinstance(body, list) else 200
+            response._content = b"" if isinstance(body, list) else json.dumps(
+                {"jsonrpc": "2.0", "id": body["id"], "result": {}}).encode()
+            return response
+
+    client = MCPClient("http://gateway/", hedge=False)
+    client.session = Gateway()
+    # One failure would open it — and fail the fallback calls too
+    client.breaker = CircuitBreaker("test-batch", failures=1, reset_after=60)
+    for _ in range(3):
+        client.supports_batch = True
+        assert all("result" in r.root for r in client.batch([("tools/list", {}), ("prompts/list", {})]))
+        assert not client.supports_batch
+    assert client.breaker.state == "closed"
@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from response_bytes import EncodedBody, EncodedCache, etag_matches
+
+CATALOG = [{"title": "Resources", "Docs": [{"name": f"doc {i}", "description": "x" * 40} for i in range(50)]}]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    body = EncodedBody.encode(CATALOG)
+
+    @app.get("/catalog")
+    async def catalog(request: Request):
+        return body.response(request, {"X-Catalog-Version": "1"})
+
+    return TestClient(app)
+
+
+def test_matching_if_none_match_returns_304(client):
+    first = client.get("/catalog", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200 and first.json() == CATALOG
+    again = client.get("/catalog", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["X-Catalog-Version"] == "1"
+
+
+def test_stale_etag_gets_the_body(client):
+    response = client.get("/catalog", headers={"Accept-Encoding": "identity", "If-None-Match": '"old"'})
+    assert response.status_code == 200 and response.json() == CATALOG
+
+
+def test_each_coding_has_its_own_etag_and_any_of_them_matches(client):
+    plain = client.get("/catalog", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert gzipped.headers["Vary"] == "Accept-Encoding"
+    # A cache that stored the gzip variant revalidates against identity and vice versa
+    assert client.get("/catalog", headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["ETag"]}).status_code == 304
+    assert client.get("/catalog", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]}).status_code == 304
+
+
+def test_etag_matching_is_weak_and_handles_lists():
+    assert etag_matches('W/"a", "b"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_small_bodies_skip_compression():
+    body = EncodedBody.encode({"ok": True})
+    assert body.gzip is None and body.br is None
+    assert gzip.decompress(EncodedBody.encode(CATALOG).gzip) == EncodedBody.encode(CATALOG).identity
+
+
+def test_encoded_cache_builds_once_per_source():
+    cache, builds = EncodedCache(), []
+    source = [1, 2, 3]
+    first = cache.get(source, "full", lambda: builds.append(1) or source)
+    assert cache.get(source, "full", lambda: builds.append(1) or source) is first
+    assert len(builds) == 1
+    # A new catalog object drops every variant of the old one
+    assert cache.peek([1, 2, 3], "full") is None
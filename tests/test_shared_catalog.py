@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import httpx
+
+from catalog_cache import CatalogCache
+from shared_catalog import SharedCatalog
+
+CATALOG = [{"title": "Resources", "Docs": [{"name": "A", "description": "first"}, {"name": "B", "description": "second"}]}]
+
+
+def worker(directory, fetches: list) -> SharedCatalog:
+    # One SharedCatalog per simulated worker; each has its own upstream client
+    async def handle(request):
+        fetches.append(request)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=json.dumps(CATALOG).encode())
+
+    cache = CatalogCache("http://upstream.invalid/catalog", ttl=60)
+    cache._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    return SharedCatalog(str(directory), cache, poll=0.02, wait=2)
+
+
+def test_second_worker_reads_the_mapped_snapshot_without_fetching(tmp_path):
+    async def main():
+        first_fetches, second_fetches = [], []
+        first, second = worker(tmp_path, first_fetches), worker(tmp_path, second_fetches)
+        await first.start()
+        published = await first.get()
+        assert first.refresher and published is not None
+
+        await second.start()
+        snapshot = await second.get()
+        assert not second.refresher
+        assert snapshot.hash == published.hash and snapshot.version == published.version
+        assert snapshot.catalog() == CATALOG
+        assert len(first_fetches) == 1 and second_fetches == []
+        await first.close()
+        await second.close()
+
+    asyncio.run(main())
+
+
+def test_standby_worker_takes_over_when_the_refresher_stops(tmp_path):
+    async def main():
+        first_fetches, second_fetches = [], []
+        first, second = worker(tmp_path, first_fetches), worker(tmp_path, second_fetches)
+        await first.start()
+        await first.get()
+        await second.start()
+        await second.get()
+        await first.close()  # releases the flock
+        for _ in range(100):
+            if second.refresher:
+                break
+            await asyncio.sleep(0.02)
+        assert second.refresher
+        # The published file is still within its TTL — no immediate refetch
+        await asyncio.sleep(0.1)
+        assert second_fetches == []
+        await second.close()
+
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+import time
+
+from snapshot_store import SnapshotCache, SnapshotStore
+
+
+class CountingStore(SnapshotStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.reads = 0
+
+    def get(self, kind, key):
+        self.reads += 1
+        return super().get(kind, key)
+
+
+def test_peek_reads_sqlite_once_per_key(tmp_path):
+    store = CountingStore(str(tmp_path / "snapshots.db"))
+    store.put("resource", "anxiety", [{"name": "a"}])
+    cache = SnapshotCache(store, "resource")
+    first = cache.peek("anxiety")
+    assert first == [{"name": "a"}]
+    assert all(cache.peek("anxiety") is first for _ in range(5))
+    assert cache.peek("missing") is None
+    assert store.reads == 2
+
+
+def test_put_replaces_the_in_memory_copy(tmp_path):
+    store = CountingStore(str(tmp_path / "snapshots.db"))
+    cache = SnapshotCache(store, "prompt")
+    assert cache.get("general", lambda: "v1") == "v1"
+    cache.put("general", "v2")
+    assert cache.peek("general") == "v2"
+    # Still written through for the next process
+    assert SnapshotCache(SnapshotStore(store.path), "prompt").peek("general") == "v2"
+
+
+def test_stale_snapshot_is_served_while_it_refreshes(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    cache = SnapshotCache(store, "prompt", refresh_after=0)
+    cache.put("general", "old")
+    time.sleep(0.01)
+    assert cache.peek("general", lambda: "new") == "old"
+    for _ in range(100):
+        if cache.peek("general") == "new":
+            break
+        time.sleep(0.01)
+    assert cache.peek("general") == "new"